@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+# Запуск из корня проекта: python benchmarks/bench_fias_load.py [--requests N] [--concurrency C] ...
+sys.path.append(os.getcwd())
+
+from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+from moslicenzia.cli import DEFAULT_FIAS_CASSETTE
+
+
+def percentile(values, p):
+    return sorted(values)[max(0, int(len(values) * p / 100) - 1)]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Нагрузочный замер check_address_fias на локальном заменителе ФИАС")
+    parser.add_argument("--requests", type=int, default=2000, help="Всего вызовов check_address_fias")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных вызовов")
+    parser.add_argument("--unique", type=int, default=200, help="Размер пула различных адресов")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--dead-path", action="append", default=[])
+    parser.add_argument("--cassette", default=DEFAULT_FIAS_CASSETTE)
+    parser.add_argument("--no-cache", action="store_true", help="Отключить кэш результатов Агента 6")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def address_pool(cassette, size, rng):
+    """Адреса из кассеты в разных написаниях плюс адреса, которых в кассете нет."""
+    known = [i["term"] for i in cassette.interactions if i.get("term")]
+    pool = []
+    for i in range(size):
+        if known and i % 2 == 0:
+            base = known[i // 2 % len(known)]
+            pool.append(rng.choice([base, base.replace("г Москва, ", ""), base.replace("ул ", "улица ").replace("д ", "дом ")]))
+        else:
+            pool.append(f"г Москва, ул Несуществующая {i}, д {i % 90 + 1}")
+    return pool
+
+
+async def run_load(server, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async def one(query):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await server.check_address_fias(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[result.get("status")] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def bench_fias_load(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    cassette = Cassette(args.cassette)
+    standin = FiasStandIn(
+        cassette, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, not_found_rate=args.not_found_rate,
+        dead_paths=args.dead_path, seed=args.seed,
+    )
+    with standin:
+        from moslicenzia.agents.agent6_mcp import server
+
+        server.FIAS_ENDPOINTS[:] = [standin.url + path for path in server.FIAS_ENDPOINT_PATHS]
+        if args.no_cache:
+            server.ADDRESS_CACHE_SIZE = 0
+
+        pool = address_pool(cassette, args.unique, rng)
+        queries = [rng.choice(pool) for _ in range(args.requests)]
+        latencies, statuses, wall = asyncio.run(run_load(server, queries, args.concurrency))
+        health = asyncio.run(server.get_fias_health())
+
+    print(f"--- check_address_fias: {args.requests} вызовов, параллельность {args.concurrency}, "
+          f"{args.unique} адресов, задержка {args.latency_ms}±{args.jitter_ms} мс ---")
+    print(f"Пропускная способность: {args.requests / wall:.0f} вызовов/с (за {wall:.2f} с)")
+    for p in (50, 90, 99):
+        print(f"p{p}: {percentile(latencies, p):.1f} мс")
+    print(f"max: {max(latencies):.1f} мс")
+    print(f"Статусы: {dict(statuses)}")
+    print(f"Запросов к заменителю: {standin.stats['requests']} ({standin.stats})")
+    print(f"Кэш: попаданий {health['cache_hits']}, объединено {health['coalesced']}, "
+          f"обращений к порталу {health['portal_lookups']}")
+    for endpoint in health["endpoints"]:
+        print(f"  {endpoint['url']}: {endpoint['state']}, успехи {endpoint['success_rate']}, "
+              f"EWMA {endpoint['latency_ms']} мс, запросов {endpoint['requests']}")
+
+
+if __name__ == "__main__":
+    bench_fias_load(build_parser().parse_args())
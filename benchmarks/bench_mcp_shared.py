@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+# Запуск из корня проекта: python benchmarks/bench_mcp_shared.py [--orchestrators N] [--calls M]
+sys.path.append(os.getcwd())
+
+from moslicenzia.agents.agent6_mcp.client import SERVER_SCRIPT, open_session
+from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+from moslicenzia.cli import DEFAULT_FIAS_CASSETTE
+
+
+def percentile(values, p):
+    return sorted(values)[max(0, int(len(values) * p / 100) - 1)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Сервер на порту {port} не запустился")
+
+
+def server_env(standin_url):
+    return {**os.environ, "MOSLICENZIA_FIAS_URL": standin_url, "NO_PROXY": "127.0.0.1,localhost"}
+
+
+def run_orchestrator(job):
+    """Один «оркестратор»: своя MCP-сессия и поток вызовов check_address_fias."""
+    url, standin_url, queries, concurrency = job
+
+    async def run():
+        latencies = []
+        async with open_session(url, env=server_env(standin_url)) as session:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(query):
+                async with semaphore:
+                    started = time.perf_counter()
+                    await session.call_tool("check_address_fias", {"address_query": query})
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.time()
+            await asyncio.gather(*(one(q) for q in queries))
+            return latencies, started, time.time()
+
+    return asyncio.run(run())
+
+
+def run_mode(name, url, standin, pool, args):
+    rng = random.Random(args.seed)
+    jobs = [
+        (url, standin.url, [rng.choice(pool) for _ in range(args.calls)], args.concurrency)
+        for _ in range(args.orchestrators)
+    ]
+    requests_before = standin.stats["requests"]
+    with multiprocessing.get_context("spawn").Pool(args.orchestrators) as workers:
+        results = workers.map(run_orchestrator, jobs)
+
+    latencies = [lat for result in results for lat in result[0]]
+    wall = max(r[2] for r in results) - min(r[1] for r in results)
+    print(f"{name}:")
+    print(f"  вызовов: {len(latencies)}, пропускная способность {len(latencies) / wall:.0f} вызовов/с")
+    print(f"  p50 {percentile(latencies, 50):.1f} мс, p99 {percentile(latencies, 99):.1f} мс")
+    print(f"  запросов к порталу (заменителю): {standin.stats['requests'] - requests_before}")
+
+
+def bench_mcp_shared(args):
+    cassette = Cassette(DEFAULT_FIAS_CASSETTE)
+    known = [i["term"] for i in cassette.interactions]
+    pool = [known[i % len(known)] if i % 2 == 0 else f"г Москва, ул Несуществующая {i}, д 1" for i in range(args.unique)]
+
+    print(f"--- Агент 6: {args.orchestrators} оркестраторов x {args.calls} вызовов "
+          f"(параллельность {args.concurrency}), задержка портала {args.latency_ms} мс ---")
+    with FiasStandIn(cassette, latency_ms=args.latency_ms, seed=args.seed) as standin:
+        # Приватные stdio-серверы: у каждого оркестратора свой кэш
+        run_mode("Приватные серверы (stdio)", None, standin, pool, args)
+
+        # Один общий сервер по streamable-HTTP: кэш и объединение запросов общие
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--transport", "streamable-http", "--port", str(port), "--json-response"],
+            env=server_env(standin.url), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(port)
+            run_mode("Общий сервер (streamable-HTTP)", f"http://127.0.0.1:{port}/mcp", standin, pool, args)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="N оркестраторов против одного сервера Агента 6")
+    parser.add_argument("--orchestrators", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=300, help="Вызовов на оркестратор")
+    parser.add_argument("--concurrency", type=int, default=8, help="Одновременных вызовов в оркестраторе")
+    parser.add_argument("--unique", type=int, default=100, help="Различных адресов в общем пуле")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=1)
+    bench_mcp_shared(parser.parse_args())
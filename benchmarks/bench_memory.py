@@ -0,0 +1,82 @@
+import copy
+import os
+import pickle
+import sys
+import tracemalloc
+
+# Запуск из корня проекта: python benchmarks/bench_memory.py
+sys.path.append(os.getcwd())
+
+from moslicenzia.agents.agent1_reception.agent import ReceptionAgent
+from moslicenzia.agents.agent2_parser.agent import ParserAgent
+from moslicenzia.schemas.models import AgentResult, ValidationStatus
+
+DOCS_DIR = "moslicenzia/data/application_docs"
+APPLICATIONS = 2000
+
+
+def load_sample():
+    reception = ReceptionAgent()
+    parser = ParserAgent()
+    extracted, results = {}, []
+    for name in sorted(os.listdir(DOCS_DIR)):
+        path = os.path.join(DOCS_DIR, name)
+        class_res = reception.classify_document(path)
+        if class_res.status != ValidationStatus.SUCCESS:
+            continue
+        parse_res = parser.parse(class_res.data["doc_type"], path)
+        record = parse_res.data.get("record")
+        if record is None:
+            continue
+        extracted.setdefault(class_res.data["doc_type"], []).append(record)
+        results.extend([class_res, parse_res])
+    return extracted, results
+
+
+def build_legacy(extracted, results):
+    """Прежнее представление: вложенные словари и копии данных в результатах агентов."""
+    data = {doc_type: [record.to_dict() for record in records] for doc_type, records in extracted.items()}
+    agent_results = [
+        AgentResult(agent_id=r.agent_id, doc_id=r.doc_id, status=r.status,
+                    data=r.data["record"].to_dict() if "record" in r.data else dict(r.data))
+        for r in results
+    ]
+    return {"extracted_data": data, "agent_results": agent_results}
+
+
+def build_compact(extracted, results):
+    """Новое представление: записи со __slots__, результаты агентов ссылаются на них."""
+    # Копия каждой записи по ее идентичности: две выписки ЕГРН одного типа остаются разными записями,
+    # и результат агента ссылается на копию своей записи, как в оркестраторе
+    copies = {id(record): copy.deepcopy(record) for items in extracted.values() for record in items}
+    records = {doc_type: [copies[id(record)] for record in items] for doc_type, items in extracted.items()}
+    agent_results = [
+        AgentResult(agent_id=r.agent_id, doc_id=r.doc_id, status=r.status,
+                    data={"record": copies[id(r.data["record"])]} if "record" in r.data else dict(r.data))
+        for r in results
+    ]
+    return {"extracted_data": records, "agent_results": agent_results}
+
+
+def measure(builder, extracted, results):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [builder(extracted, results) for _ in range(APPLICATIONS)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(states[0], protocol=pickle.HIGHEST_PROTOCOL))
+    extracted_pickled = len(pickle.dumps(states[0]["extracted_data"], protocol=pickle.HIGHEST_PROTOCOL))
+    return (after - before) / APPLICATIONS, pickled, extracted_pickled
+
+
+def bench_memory():
+    extracted, results = load_sample()
+    print(f"--- Memory Footprint per Application ({APPLICATIONS} applications) ---")
+    print(f"{'Представление':<28} {'память, байт':>14} {'pickle состояния':>18} {'pickle extracted':>18}")
+    for label, builder in [("dict + копии (прежнее)", build_legacy), ("records + ссылки", build_compact)]:
+        per_app, pickled, extracted_pickled = measure(builder, extracted, results)
+        print(f"{label:<28} {per_app:>14.0f} {pickled:>18} {extracted_pickled:>18}")
+
+
+if __name__ == "__main__":
+    bench_memory()
@@ -0,0 +1,65 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Запуск из корня проекта: python benchmarks/bench_registry.py [число записей]
+sys.path.append(os.getcwd())
+
+from moslicenzia.storage.registry import RevokedLicenseRegistry
+
+RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+LOOKUPS = 2000
+
+
+def synthetic_records(count):
+    for i in range(count):
+        yield {
+            "inn": f"77{i:08d}",
+            "ogrn": f"1{i:012d}",
+            "kpp": "772501001",
+            "address": f"г Москва, ул Тестовая {i % 5000}, д {i % 300}",
+            "company_name": f"ООО Тест {i}",
+            "license_number": f"77РПА{i:07d}",
+            "status": "REVOKED",
+            "event_date": "2024-01-01",
+            "reason": "Синтетическая запись",
+        }
+
+
+def percentile(values, p):
+    return sorted(values)[int(len(values) * p / 100) - 1]
+
+
+def bench_registry():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = RevokedLicenseRegistry(f"sqlite:///{os.path.join(tmp_dir, 'registry.db')}")
+
+        start = time.perf_counter()
+        registry.bulk_load(synthetic_records(RECORDS), source="synthetic")
+        load_time = time.perf_counter() - start
+
+        print(f"--- Revoked License Registry ({RECORDS} records) ---")
+        print(f"Загрузка + фильтр Блума: {load_time:.1f} с ({RECORDS / load_time:.0f} записей/с)")
+
+        cases = {
+            "ИНН найден": lambda: registry.lookup(inn=f"77{random.randrange(RECORDS):08d}"),
+            "ИНН чистый (Блум)": lambda: registry.lookup(inn=f"99{random.randrange(RECORDS):08d}"),
+            "ИНН+ОГРН+адрес чистые": lambda: registry.lookup(
+                inn=f"99{random.randrange(RECORDS):08d}", ogrn=f"5{random.randrange(RECORDS):012d}",
+                address=f"г Москва, ул Чистая {random.randrange(RECORDS)}"),
+        }
+        print(f"{'Сценарий':<26} {'p50, мс':>9} {'p99, мс':>9}")
+        for label, lookup in cases.items():
+            timings = []
+            for _ in range(LOOKUPS):
+                start = time.perf_counter()
+                lookup()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{label:<26} {statistics.median(timings):>9.3f} {percentile(timings, 99):>9.3f}")
+
+
+if __name__ == "__main__":
+    bench_registry()
@@ -0,0 +1,80 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Запуск из корня проекта: python benchmarks/bench_results.py [число результатов]
+sys.path.append(os.getcwd())
+
+from moslicenzia.storage.results import ExpertiseResultStore
+
+RESULTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+APPLICANTS = 20_000
+QUERIES = 1000
+STATUSES = ("SUCCESS", "WARNING", "FAILURE")
+RECOMMENDATIONS = {"SUCCESS": "Одобрить", "WARNING": "Требуется уточнение", "FAILURE": "Отказать"}
+START = datetime(2026, 1, 1)
+
+
+def synthetic_rows(count, rng):
+    findings = '["УСПЕХ: ИНН совпадает с данными ЕГРЮЛ.", "КРИТИЧЕСКАЯ ОШИБКА: Несоответствие КПП для данного адреса."]'
+    for i in range(count):
+        applicant = rng.randrange(APPLICANTS)
+        status = rng.choice(STATUSES)
+        yield {
+            "application_id": f"APP-{i:08d}",
+            "inn": f"77{applicant:08d}",
+            "ogrn": f"1{applicant:012d}",
+            "company_name": f"ООО Тест {applicant}",
+            "status": status,
+            "recommendation": RECOMMENDATIONS[status],
+            "created_at": START + timedelta(minutes=i * 525600 // count),
+            "findings": findings,
+            "documents": "[]",
+            "extracted_data": "{}",
+            "report": "Синтетический отчет " * 50,
+        }
+
+
+def day_failures(store, day):
+    return store.query(status="FAILURE", since=day, until=day + timedelta(days=1))
+
+
+def percentile(values, p):
+    return sorted(values)[int(len(values) * p / 100) - 1]
+
+
+def bench_results():
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ExpertiseResultStore(f"sqlite:///{os.path.join(tmp_dir, 'results.db')}")
+
+        start = time.perf_counter()
+        store.save_rows(synthetic_rows(RESULTS, rng))
+        load_time = time.perf_counter() - start
+
+        print(f"--- Expertise Result Store ({RESULTS} results) ---")
+        print(f"Пакетная вставка: {load_time:.1f} с ({RESULTS / load_time:.0f} результатов/с)")
+
+        cases = {
+            "Отказы по ИНН за месяц": lambda: store.query(
+                inn=f"77{rng.randrange(APPLICANTS):08d}", status="FAILURE",
+                since=date(2026, 6, 1), until=date(2026, 7, 1)),
+            "По номеру заявления": lambda: store.latest(f"APP-{rng.randrange(RESULTS):08d}"),
+            "Отказы за день": lambda: day_failures(store, date(2026, 3, 1) + timedelta(days=rng.randrange(200))),
+        }
+        print(f"{'Запрос':<26} {'p50, мс':>9} {'p99, мс':>9}")
+        for label, query in cases.items():
+            timings = []
+            for _ in range(QUERIES):
+                start = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{label:<26} {statistics.median(timings):>9.3f} {percentile(timings, 99):>9.3f}")
+
+
+if __name__ == "__main__":
+    bench_results()
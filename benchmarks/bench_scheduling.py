@@ -0,0 +1,122 @@
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Запуск из корня проекта: python benchmarks/bench_scheduling.py [--small N] [--large N] [--large-mb MB]
+sys.path.append(os.getcwd())
+
+from moslicenzia.agents.agent4_analytical.agent import AnalyticalOrchestrator
+from moslicenzia.agents.agent6_mcp.client import PersistentSession
+from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+from moslicenzia.cli import DEFAULT_FIAS_CASSETTE, _discover_applications
+from moslicenzia.scheduling import estimate_cost, run_scheduled
+
+DOCS = sorted(glob.glob("moslicenzia/data/application_docs/*.xml"))
+
+
+def percentile(values, p):
+    return sorted(values)[max(0, int(len(values) * p / 100) - 1)]
+
+
+def _write_package(target: str, house: int, pad_mb: float = 0.0) -> None:
+    """
+    Копия реального пакета с уникальным адресом объекта (каждое заявление обращается к ФИАС).
+    pad_mb — размер, до которого дополняется выписка ЕГРН точками контура (крупный объект).
+    """
+    os.makedirs(target)
+    for path in DOCS:
+        name = os.path.basename(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        if name.startswith("Заявление"):
+            data = data.replace(b"<house>18</house>", b"<house>%d</house>" % house)
+            data = data.replace("Дом 18".encode("utf-8"), ("Дом %d" % house).encode("utf-8"))
+        elif pad_mb and "ЕГРН" in name:
+            start = data.index(b"<ordinate>")
+            point = data[start:data.index(b"</ordinate>", start) + len(b"</ordinate>")]
+            data = data[:start] + point * int(pad_mb * 1024 * 1024 / len(point)) + data[start:]
+        with open(os.path.join(target, name), "wb") as f:
+            f.write(data)
+
+
+def build_tree(root: str, small: int, large: int, large_mb: float, house_base: int) -> None:
+    """Крупные заявления равномерно перемешаны с мелкими, первое в обходе — крупное."""
+    step = max(1, (small + large) // max(1, large))
+    small_index = large_index = 0
+    for i in range(small + large):
+        if large_index < large and i % step == 0:
+            _write_package(os.path.join(root, f"{i:03d}_large"), house_base + i, large_mb)
+            large_index += 1
+        elif small_index < small:
+            _write_package(os.path.join(root, f"{i:03d}_small"), house_base + i)
+            small_index += 1
+
+
+def run_scenario(label, root, order, jobs, env):
+    # Новая MCP-сессия на сценарий: кэш адресов Агента 6 не переносится между прогонами
+    session = PersistentSession(env=env).start()
+    orchestrator = AnalyticalOrchestrator(mcp_session=session)
+    try:
+        def run(app_id, paths):
+            return orchestrator.run_expertise([{"path": p} for p in paths], app_id=app_id)
+
+        started = time.perf_counter()
+        latency = {}
+        for app_id, _, error, _ in run_scheduled(run, _discover_applications(root), jobs=jobs, order=order):
+            if error is not None:
+                raise error
+            latency[app_id] = (time.perf_counter() - started) * 1000
+        makespan = (time.perf_counter() - started) * 1000
+    finally:
+        session.close()
+
+    small = [ms for app_id, ms in latency.items() if app_id.endswith("_small")]
+    large = [ms for app_id, ms in latency.items() if app_id.endswith("_large")]
+    print(f"{label:<30} {statistics.median(small):>9.0f} {percentile(small, 99):>9.0f} "
+          f"{max(large) if large else 0:>11.0f} {makespan:>10.0f}")
+
+
+def bench_scheduling(args):
+    tmp_dir = tempfile.mkdtemp(prefix="moslicenzia-sched-")
+    try:
+        scenarios = [("submission", 1), ("cost", 1), ("submission", args.jobs), ("cost", args.jobs)]
+        roots = []
+        for n in range(len(scenarios)):
+            root = os.path.join(tmp_dir, f"run{n}")
+            build_tree(root, args.small, args.large, args.large_mb, house_base=100 + n * 1000)
+            roots.append(root)
+
+        apps = list(_discover_applications(roots[0]))
+        started = time.perf_counter()
+        costs = {app_id: estimate_cost(paths) for app_id, paths in apps}
+        estimate_ms = (time.perf_counter() - started) * 1000
+        small_cost = next(c for app_id, c in costs.items() if app_id.endswith("_small"))
+        large_cost = next((c for app_id, c in costs.items() if app_id.endswith("_large")), None)
+        print(f"--- Планирование: {args.small} мелких и {args.large} крупных заявлений "
+              f"(ЕГРН ~{args.large_mb} МБ), задержка ФИАС {args.latency_ms} мс ---")
+        print(f"Оценка стоимости {len(apps)} заявлений: {estimate_ms:.1f} мс; "
+              f"мелкое ~{small_cost.total_ms:.0f} мс, крупное ~{large_cost.total_ms if large_cost else 0:.0f} мс")
+
+        with FiasStandIn(Cassette(DEFAULT_FIAS_CASSETTE), latency_ms=args.latency_ms) as standin:
+            env = {**os.environ, "MOSLICENZIA_FIAS_URL": standin.url,
+                   "NO_PROXY": "127.0.0.1,localhost", "MOSLICENZIA_MCP_LOG_LEVEL": "WARNING"}
+            print(f"{'Сценарий':<30} {'p50 мелк.':>9} {'p99 мелк.':>9} {'макс. крупн.':>11} {'всего, мс':>10}")
+            for (order, jobs), root in zip(scenarios, roots):
+                run_scenario(f"{order}, jobs={jobs}", root, order, jobs, env)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Порядок поступления против SJF со старением в пакетном режиме")
+    parser.add_argument("--small", type=int, default=24)
+    parser.add_argument("--large", type=int, default=3)
+    parser.add_argument("--large-mb", type=float, default=15.0)
+    parser.add_argument("--jobs", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Задержка заменителя портала ФИАС")
+    bench_scheduling(parser.parse_args())
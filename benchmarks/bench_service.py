@@ -0,0 +1,94 @@
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Запуск из корня проекта: python benchmarks/bench_service.py [--requests N] [--workers W]
+sys.path.append(os.getcwd())
+
+import httpx
+
+from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+from moslicenzia.cli import DEFAULT_FIAS_CASSETTE
+from moslicenzia.service import ExpertiseService, WorkerPool
+
+DOCS = sorted(glob.glob("moslicenzia/data/application_docs/*.xml"))
+
+
+def percentile(values, p):
+    return sorted(values)[max(0, int(len(values) * p / 100) - 1)]
+
+
+def report(label, timings):
+    print(f"{label:<34} {statistics.median(timings):>9.1f} {percentile(timings, 99):>9.1f}")
+
+
+def cold_run():
+    """Холодный запуск: новый процесс импортирует зависимости, строит граф и запускает MCP."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "moslicenzia", "expertise", *DOCS],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def warm_run(client, url):
+    files = [("file", (os.path.basename(p), open(p, "rb"), "application/xml")) for p in DOCS]
+    started = time.perf_counter()
+    try:
+        response = client.post(f"{url}/expertise?stream=0", files=files)
+    finally:
+        for _, (_, f, _) in files:
+            f.close()
+    total = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    return total, float(response.headers["X-Expertise-Ms"]), float(response.headers["X-Queue-Ms"])
+
+
+def bench_service(args):
+    with FiasStandIn(Cassette(DEFAULT_FIAS_CASSETTE), latency_ms=args.latency_ms) as standin:
+        # Воркеры и серверы Агента 6 наследуют окружение и обращаются к заменителю портала
+        os.environ["MOSLICENZIA_FIAS_URL"] = standin.url
+        os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+        os.environ["MOSLICENZIA_MCP_LOG_LEVEL"] = "WARNING"
+
+        print(f"--- Сервис экспертизы: {len(DOCS)} документов, {args.requests} запросов, "
+              f"{args.workers} воркеров, параллельность {args.concurrency} ---")
+        print(f"{'Сценарий':<34} {'p50, мс':>9} {'p99, мс':>9}")
+        report("Холодный запуск CLI (процесс)", [cold_run() for _ in range(args.cold)])
+
+        started = time.perf_counter()
+        pool = WorkerPool(args.workers).start()
+        print(f"Запуск пула: {(time.perf_counter() - started):.1f} с "
+              f"(MCP-сессии: {sum(1 for w in pool.workers if w.info.get('mcp_session'))}/{args.workers})")
+        service = ExpertiseService(pool, port=0)
+        threading.Thread(target=service.serve_forever, daemon=True).start()
+        try:
+            with httpx.Client(timeout=120, trust_env=False) as client:
+                warm_run(client, service.url)  # первый запрос заполняет кэш адресов Агента 6
+                started = time.perf_counter()
+                with ThreadPoolExecutor(args.concurrency) as executor:
+                    results = list(executor.map(lambda _: warm_run(client, service.url), range(args.requests)))
+                wall = time.perf_counter() - started
+        finally:
+            service.httpd.shutdown()
+            service.close()
+
+        report("Прогретый сервис: весь запрос", [r[0] for r in results])
+        report("  из них экспертиза (X-Expertise-Ms)", [r[1] for r in results])
+        report("  ожидание воркера (X-Queue-Ms)", [r[2] for r in results])
+        print(f"Пропускная способность сервиса: {args.requests / wall:.1f} заявлений/с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Холодный запуск экспертизы против прогретого пула воркеров")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--cold", type=int, default=3, help="Число холодных запусков CLI")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Задержка заменителя портала ФИАС")
+    bench_service(parser.parse_args())
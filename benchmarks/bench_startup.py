@@ -0,0 +1,43 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Запуск из корня проекта: python benchmarks/bench_startup.py
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SAMPLE_DOC = os.path.join("moslicenzia", "data", "application_docs", "Заявление о выдаче лицензии.xml")
+
+RUNS = 5
+
+CASES = [
+    ("python (пустой запуск)", ["-c", "pass"]),
+    ("import agent1_reception", ["-c", "import moslicenzia.agents.agent1_reception.agent"]),
+    ("import agent2_parser", ["-c", "import moslicenzia.agents.agent2_parser.agent"]),
+    ("import agent4_analytical", ["-c", "import moslicenzia.agents.agent4_analytical.agent"]),
+    ("import langgraph.graph", ["-c", "import langgraph.graph"]),
+    ("moslicenzia --help", ["-m", "moslicenzia", "--help"]),
+    ("moslicenzia classify", ["-m", "moslicenzia", "classify", SAMPLE_DOC]),
+    ("moslicenzia parse", ["-m", "moslicenzia", "parse", SAMPLE_DOC]),
+]
+
+
+def measure(args):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def bench_startup():
+    print("--- Startup / Import Time Benchmark ---")
+    print(f"{'Сценарий':<30} {'медиана, мс':>12} {'мин, мс':>10}")
+    for label, args in CASES:
+        median, best = measure(args)
+        print(f"{label:<30} {median:>12.1f} {best:>10.1f}")
+
+
+if __name__ == "__main__":
+    bench_startup()
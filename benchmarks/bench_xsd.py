@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+import lxml.etree as ET
+
+# Запуск из корня проекта: python benchmarks/bench_xsd.py
+sys.path.append(os.getcwd())
+
+from moslicenzia.schemas.models import DocType
+
+RUNS = 50
+# Число сложных типов в синтетической схеме (схемы СМЭВ содержат сотни типов)
+SCHEMA_TYPES = 400
+
+
+def build_schema(path):
+    """Синтетическая XSD, по объему сопоставимая с реальными схемами ответов СМЭВ."""
+    types = "".join(
+        f'<xs:complexType name="T{i}"><xs:sequence>'
+        f'<xs:element name="A{i}" type="xs:string" minOccurs="0"/>'
+        f'<xs:element name="B{i}" type="xs:decimal" minOccurs="0"/>'
+        f'</xs:sequence><xs:attribute name="id{i}" type="xs:string"/></xs:complexType>'
+        for i in range(SCHEMA_TYPES)
+    )
+    elements = "".join(f'<xs:element name="E{i}" type="T{i}" minOccurs="0"/>' for i in range(SCHEMA_TYPES))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+            f'{types}<xs:element name="Root"><xs:complexType><xs:sequence>{elements}'
+            '</xs:sequence></xs:complexType></xs:element></xs:schema>'
+        )
+
+
+def bench_xsd():
+    with tempfile.TemporaryDirectory() as xsd_dir:
+        os.environ["MOSLICENZIA_XSD_DIR"] = xsd_dir
+        from moslicenzia.agents.agent2_parser import xsd
+
+        path = os.path.join(xsd_dir, f"{DocType.EGRUL.value}.xsd")
+        build_schema(path)
+        root = ET.fromstring("<Root>" + "".join(f"<E{i}><A{i}>x</A{i}></E{i}>" for i in range(0, SCHEMA_TYPES, 4)) + "</Root>")
+
+        print(f"--- XSD Validation: cached vs uncached ({RUNS} documents) ---")
+
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            ET.XMLSchema(ET.parse(path)).validate(root)
+        uncached = (time.perf_counter() - start) * 1000 / RUNS
+
+        xsd.clear_schema_cache()
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            xsd.validate_tree(DocType.EGRUL, root)
+        cached = (time.perf_counter() - start) * 1000 / RUNS
+
+        print(f"Без кэша (компиляция на каждый документ): {uncached:.3f} мс/док")
+        print(f"С кэшем скомпилированных схем:           {cached:.3f} мс/док")
+        print(f"Ускорение: x{uncached / cached:.1f}")
+
+
+if __name__ == "__main__":
+    bench_xsd()
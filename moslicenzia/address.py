@@ -0,0 +1,164 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Каноническая нормализация адресов в свободной форме.
+# "ул. Автозаводская, 18" и "г Москва, ул Автозаводская, д 18" дают один ключ,
+# поэтому ключ используется для кэшей ФИАС, дедупликации запросов и индексов по адресу.
+
+# Сокращения типов адресных элементов: любая форма -> каноническая
+ABBREVIATIONS: Dict[str, str] = {
+    # Субъекты и районы
+    "область": "обл", "обл": "обл",
+    "республика": "респ", "респ": "респ",
+    "край": "край",
+    "район": "рн", "рн": "рн",
+    # Населенные пункты
+    "город": "г", "гор": "г", "г": "г",
+    "поселок": "п", "пос": "п", "п": "п",
+    "деревня": "дер", "дер": "дер",
+    "село": "село",
+    # Элементы улично-дорожной сети
+    "улица": "ул", "ул": "ул",
+    "проспект": "пркт", "пркт": "пркт", "просп": "пркт", "прт": "пркт",
+    "переулок": "пер", "пер": "пер",
+    "шоссе": "ш", "ш": "ш",
+    "бульвар": "бр", "бр": "бр", "бул": "бр",
+    "площадь": "пл", "пл": "пл",
+    "набережная": "наб", "наб": "наб",
+    "проезд": "проезд", "прд": "проезд",
+    "тупик": "туп", "туп": "туп",
+    "микрорайон": "мкр", "мкрн": "мкр", "мкр": "мкр",
+    # Здания и помещения
+    "дом": "д", "д": "д",
+    "владение": "вл", "вл": "вл",
+    "домовладение": "двл", "двл": "двл",
+    "корпус": "к", "корп": "к", "к": "к",
+    "строение": "стр", "стр": "стр",
+    "квартира": "кв", "кв": "кв",
+    "помещение": "пом", "пом": "пом",
+    "офис": "оф", "оф": "оф",
+    "этаж": "эт", "эт": "эт",
+}
+
+# Типы, к которым привязывается следующий за ними номер ("д 18" -> "д18")
+NUMBERED_TYPES = frozenset({"д", "вл", "двл", "к", "стр", "кв", "пом", "оф", "эт"})
+
+# Токены, не влияющие на идентичность адреса в пределах г. Москвы
+IGNORED_TOKENS = frozenset({"г", "москва", "россия", "российская", "федерация", "рф"})
+
+# Канонические типы адресных элементов (не являются частью названия)
+ELEMENT_TYPES = frozenset(ABBREVIATIONS.values())
+
+# Порядковый номер в названии улицы ("1-я Тверская-Ямская", "2-й Донской"): окончание отбрасывается
+_ORDINAL_RE = re.compile(r"(\d+)-(?:ая|яя|ой|ый|ий|я|й|е)")
+# Номер дома/корпуса: цифры, дробь и однобуквенная литера ("18", "18/2", "18а"; "18к2" делится на 18, к, 2)
+_TOKEN_RE = re.compile(
+    r"\d+-(?:ая|яя|ой|ый|ий|я|й|е)(?![а-яa-z\d])|\d+(?:/\d+)?(?:[а-яa-z](?![а-яa-z\d]))?|[а-яa-z]+"
+)
+_INNER_HYPHEN_RE = re.compile(r"(?<=[а-яa-z])-(?=[а-яa-z])")
+_POSTCODE_RE = re.compile(r"\d{6}")
+
+
+def address_tokens(address: Optional[str]) -> List[str]:
+    """
+    Канонические токены адреса в исходном порядке.
+    Порядковый номер улицы присоединяется к названию ("1-я Тверская-Ямская" -> "1тверскаяямская").
+    Номер дома берется после типа (д, дом, вл); без типа домом считается последний номер.
+    """
+    if not address:
+        return []
+    text = _INNER_HYPHEN_RE.sub("", address.lower().replace("ё", "е"))
+
+    tokens: List[str] = []
+    bare: List[int] = []
+    has_house = False
+    pending_type = None
+    pending_ordinal = None
+
+    def attach_ordinal() -> None:
+        # Порядковый номер после названия ("Тверская-Ямская 1-я ул"): к последнему названию
+        nonlocal pending_ordinal
+        if pending_ordinal is None:
+            return
+        for i in range(len(tokens) - 1, -1, -1):
+            if tokens[i].isalpha() and tokens[i] not in ELEMENT_TYPES:
+                tokens[i] = pending_ordinal + tokens[i]
+                break
+        else:
+            tokens.append(pending_ordinal)
+        pending_ordinal = None
+
+    for raw in _TOKEN_RE.findall(text):
+        ordinal = _ORDINAL_RE.fullmatch(raw)
+        if ordinal:
+            attach_ordinal()
+            pending_ordinal = ordinal.group(1)
+            continue
+        if raw[0].isdigit():
+            attach_ordinal()
+            if _POSTCODE_RE.fullmatch(raw):
+                continue
+            if pending_type is not None:
+                tokens.append(pending_type + raw)
+                has_house = has_house or pending_type in ("д", "вл", "двл")
+                pending_type = None
+            else:
+                bare.append(len(tokens))
+                tokens.append(raw)
+            continue
+
+        if pending_type is not None:
+            tokens.append(pending_type)
+            pending_type = None
+        token = ABBREVIATIONS.get(raw, raw)
+        if token in IGNORED_TOKENS:
+            continue
+        if token in NUMBERED_TYPES:
+            pending_type = token
+        elif pending_ordinal is not None and token not in ELEMENT_TYPES:
+            tokens.append(pending_ordinal + token)
+            pending_ordinal = None
+        else:
+            tokens.append(token)
+
+    attach_ordinal()
+    if pending_type is not None:
+        tokens.append(pending_type)
+    if not has_house and bare:
+        # Номер без типа ("ул. Автозаводская, 18") — номер дома
+        tokens[bare[-1]] = "д" + tokens[bare[-1]]
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def address_key(address: Optional[str]) -> Optional[str]:
+    """
+    Стабильный ключ адреса: регистр, пунктуация, ё/е, форма сокращений
+    и порядок элементов не влияют на результат.
+    """
+    tokens = address_tokens(address)
+    return " ".join(sorted(tokens)) if tokens else None
+
+
+def address_keys(addresses: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Пакетная нормализация: ключи в порядке входных адресов."""
+    return [address_key(address) for address in addresses]
+
+
+def group_by_address_key(addresses: Iterable[Optional[str]]) -> Dict[str, List[int]]:
+    """
+    Группирует адреса по ключу: ключ -> индексы входных адресов.
+    Для каждой группы достаточно одного запроса к ФИАС. Адреса без ключа пропускаются.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, key in enumerate(address_keys(addresses)):
+        if key is not None:
+            groups.setdefault(key, []).append(i)
+    return groups
+
+
+def compose_address(*parts: Optional[str]) -> Optional[str]:
+    """Собирает адрес из отдельных полей, пропуская пустые."""
+    text = ", ".join(part.strip() for part in parts if part and part.strip())
+    return text or None
@@ -3,6 +3,21 @@ import lxml.etree as ET
 from typing import Dict, Any, Optional
 from moslicenzia.schemas.models import DocType, AgentResult, ValidationStatus
 
+def doc_type_from_filename(file_path: str) -> Optional[DocType]:
+    """Тип документа по имени файла (подсказка, не требующая чтения файла)."""
+    filename = os.path.basename(file_path).lower()
+    if "заявление" in filename:
+        return DocType.APPLICATION
+    if "егрн" in filename:
+        return DocType.ROSREESTR
+    if "егрюл" in filename:
+        return DocType.EGRUL
+    if "рнип" in filename:
+        return DocType.RNIP_DUTY if "оплатах" in filename else DocType.RNIP_FINES
+    if "фнс" in filename and "задолженност" in filename:
+        return DocType.FNS_TAX_DEBT
+    return None
+
 class ReceptionAgent:
     """
     Агент 1: Прием и Классификация.
@@ -39,8 +54,26 @@ class ReceptionAgent:
         # Настроим на основе просмотренных XML.
         pass
 
-    def classify_document(self, file_path: str) -> AgentResult:
-        if not os.path.exists(file_path):
+    def _classify_by_content(self, root: ET._Element) -> Optional[DocType]:
+        # Выписки ЕГРН имеют корневые теги вида extract_about_property_build, extract_base_params_build
+        local_name = ET.QName(root).localname
+        if local_name.startswith("extract_"):
+            return DocType.ROSREESTR
+
+        for tag, classifier in self.doc_signatures.items():
+            elem = root if local_name == tag else root.find(f".//{tag}")
+            if elem is not None:
+                doc_type = classifier(elem)
+                if doc_type:
+                    return doc_type
+        return None
+
+    def classify_document(self, file_path: str, content: Optional[bytes] = None) -> AgentResult:
+        """
+        Классифицирует документ по пути к файлу либо по уже прочитанному содержимому
+        (например, члену ZIP-архива); в последнем случае file_path служит только именем.
+        """
+        if content is None and not os.path.exists(file_path):
             return AgentResult(
                 agent_id="agent_1",
                 doc_id=os.path.basename(file_path),
@@ -49,31 +82,17 @@ class ReceptionAgent:
             )
 
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            tag = root.tag
-            
-            doc_type = None
+            if content is not None:
+                root = ET.fromstring(content)
+            else:
+                root = ET.parse(file_path).getroot()
             
             # 1. Проверка по имени файла (fallback или подсказка)
-            filename = os.path.basename(file_path).lower()
-            if "заявление" in filename:
-                doc_type = DocType.APPLICATION
-            elif "егрн" in filename:
-                doc_type = DocType.ROSREESTR
-            elif "егрюл" in filename:
-                doc_type = DocType.EGRUL
-            elif "рнип" in filename:
-                if "оплатах" in filename:
-                    doc_type = DocType.RNIP_DUTY
-                else:
-                    doc_type = DocType.RNIP_FINES
-            elif "фнс" in filename and "задолженност" in filename:
-                doc_type = DocType.FNS_TAX_DEBT
+            doc_type = doc_type_from_filename(file_path)
 
-            # 2. Уточнение по содержимому, если необходимо (для надежности)
-               # Логика общего анализа содержимого здесь
-               pass
+            # 2. Уточнение по содержимому (члены архивов часто имеют служебные имена, напр. _ZIP-_~2.XML)
+            if doc_type is None:
+                doc_type = self._classify_by_content(root)
 
             if doc_type:
                 return AgentResult(
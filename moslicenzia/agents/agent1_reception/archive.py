@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO, Iterator, Tuple, Union
+
+# Расширения членов архива, которые передаются классификатору
+XML_EXTENSIONS = (".xml",)
+
+# Ограничение глубины вложенности архивов (защита от "zip-бомб" из архивов в архивах)
+MAX_ARCHIVE_DEPTH = 5
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Вложенный архив до этого размера держится в памяти, крупнее — во временном файле
+NESTED_SPOOL_LIMIT = int(os.environ.get("MOSLICENZIA_NESTED_ARCHIVE_SPOOL", str(8 * 1024 * 1024)))
+
+
+def is_archive(path: str) -> bool:
+    """Проверяет, является ли файл ZIP-архивом (по сигнатуре, а не по расширению)."""
+    return os.path.isfile(path) and zipfile.is_zipfile(path)
+
+
+def iter_archive_members(
+    source: Union[str, BinaryIO], prefix: str = "", depth: int = 0
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Потоково перебирает XML-документы ZIP-архива, включая вложенные архивы.
+    Возвращает пары (путь члена внутри пакета, содержимое) без распаковки XML на диск.
+    В памяти одновременно находится только текущий член; вложенный архив крупнее
+    NESTED_SPOOL_LIMIT переносится во временный файл.
+    """
+    if depth > MAX_ARCHIVE_DEPTH:
+        return
+
+    if not prefix:
+        prefix = os.path.basename(source) if isinstance(source, str) else "archive.zip"
+
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+
+            member_path = f"{prefix}/{info.filename}"
+            name_lower = info.filename.lower()
+
+            if name_lower.endswith(XML_EXTENSIONS):
+                with archive.open(info) as member:
+                    yield member_path, member.read()
+                continue
+
+            # Вложенный архив: ZipFile требует seekable-поток, поэтому член копируется
+            # в буфер, который при превышении NESTED_SPOOL_LIMIT уходит во временный файл
+            with archive.open(info) as member:
+                if member.read(len(ZIP_MAGIC)) != ZIP_MAGIC:
+                    continue
+            with tempfile.SpooledTemporaryFile(max_size=NESTED_SPOOL_LIMIT, prefix="moslicenzia-nested-") as nested:
+                with archive.open(info) as member:
+                    shutil.copyfileobj(member, nested)
+                nested.seek(0)
+                yield from iter_archive_members(nested, prefix=member_path, depth=depth + 1)
@@ -1,7 +1,24 @@
+import io
 import os
 import lxml.etree as ET
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from moslicenzia.address import compose_address
 from moslicenzia.schemas.models import DocType, AgentResult, ValidationStatus
+from moslicenzia.schemas.records import (
+    ApplicationRecord, EgrulRecord, FnsDebtRecord,
+    ObjectRecord, RosreestrRecord, SubdivisionRecord,
+)
+from moslicenzia.agents.agent2_parser.rnip import aggregate_charges, aggregate_payments
+from moslicenzia.agents.agent2_parser.xsd import (
+    XsdValidationMode, format_errors, syntax_errors, validate_stream, validate_tree,
+)
+
+# Элементы ЕГРЮЛ со сведениями об обособленных подразделениях
+EGRUL_SUBDIVISION_TAGS = (
+    ("BRANCH", "СвФилиал"),
+    ("REPRESENTATIVE", "СвПредстав"),
+    ("SUBDIVISION", "СвУчОргМН"),
+)
 
 class ParserAgent:
     """
@@ -9,31 +26,81 @@ class ParserAgent:
     Извлекает ключевые поля из нормализованных XML-документов.
     """
     
-    def parse(self, doc_type: DocType, file_path: str) -> AgentResult:
+    def __init__(self, xsd_mode: XsdValidationMode = XsdValidationMode.OFF):
+        self.xsd_mode = XsdValidationMode(xsd_mode)
+
+    def _load_tree(self, file_path: str, content: Optional[bytes]) -> ET._Element:
+        if content is not None:
+            return ET.fromstring(content)
+        return ET.parse(file_path).getroot()
+
+    def parse(self, doc_type: DocType, file_path: str, content: Optional[bytes] = None) -> AgentResult:
+        """
+        Извлекает данные из файла либо из уже прочитанного содержимого (член ZIP-архива).
+        Извлеченная запись возвращается в data["record"] (None для неподдерживаемых типов),
+        ошибки XSD-валидации (если она включена) — в data["xsd_errors"].
+        """
+        root = None
+        xsd_errors = None
+        # Журнал ошибок lxml общий для потока: ошибки разбора должны относиться только к этому документу
+        ET.clear_error_log()
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            data = {}
-            if doc_type == DocType.APPLICATION:
-                data = self._parse_application(root)
-            elif doc_type == DocType.EGRUL:
-                data = self._parse_egrul(root)
-            elif doc_type == DocType.FNS_TAX_DEBT:
-                data = self._parse_fns(root)
-            elif doc_type == DocType.RNIP_DUTY:
-                data = self._parse_rnip(root)
-            elif doc_type == DocType.ROSREESTR:
-                data = self._parse_rosreestr(root)
+            record = None
+            # Ответы РНиП могут содержать сотни платежей: разбираются потоково, без построения дерева
+            if doc_type in (DocType.RNIP_DUTY, DocType.RNIP_FINES):
+                if self.xsd_mode == XsdValidationMode.ALWAYS:
+                    # Отдельный потоковый проход со схемой: память не растет, но документ читается дважды
+                    xsd_errors = validate_stream(doc_type, io.BytesIO(content) if content is not None else file_path)
+                source = io.BytesIO(content) if content is not None else file_path
+                if doc_type == DocType.RNIP_DUTY:
+                    record = aggregate_payments(source)
+                else:
+                    record = aggregate_charges(source)
+            else:
+                root = self._load_tree(file_path, content)
+                if self.xsd_mode == XsdValidationMode.ALWAYS:
+                    xsd_errors = validate_tree(doc_type, root)
+
+                if doc_type == DocType.APPLICATION:
+                    record = self._parse_application(root)
+                elif doc_type == DocType.EGRUL:
+                    record = self._parse_egrul(root)
+                elif doc_type == DocType.FNS_TAX_DEBT:
+                    record = self._parse_fns(root)
+                elif doc_type == DocType.ROSREESTR:
+                    record = self._parse_rosreestr(root)
             
+            data = {"record": record}
+            comment = None
+            if xsd_errors:
+                data["xsd_errors"] = xsd_errors
+                comment = f"XSD Validation: {len(xsd_errors)} ошибок: {format_errors(xsd_errors)}"
             return AgentResult(
                 agent_id="agent_2",
                 doc_id=os.path.basename(file_path),
                 status=ValidationStatus.SUCCESS,
-                data=data
+                data=data,
+                comment=comment
             )
         except Exception as e:
             import traceback
+            # Некорректный XML: позиции ошибок берутся из журнала парсера, схема не нужна
+            if isinstance(e, ET.XMLSyntaxError):
+                return self._syntax_failure(file_path, e)
+            # Дешевый режим: схема проверяется только для документов, которые не удалось разобрать
+            if self.xsd_mode == XsdValidationMode.ON_FAILURE:
+                try:
+                    xsd_errors = validate_tree(doc_type, root if root is not None else self._load_tree(file_path, content))
+                except ET.XMLSyntaxError as syntax_error:
+                    return self._syntax_failure(file_path, syntax_error)
+            if xsd_errors:
+                return AgentResult(
+                    agent_id="agent_2",
+                    doc_id=os.path.basename(file_path),
+                    status=ValidationStatus.FAILURE,
+                    data={"xsd_errors": xsd_errors},
+                    comment=f"XSD Validation Error: {len(xsd_errors)} ошибок: {format_errors(xsd_errors)}"
+                )
             return AgentResult(
                 agent_id="agent_2",
                 doc_id=os.path.basename(file_path),
@@ -41,79 +108,149 @@ class ParserAgent:
                 comment=f"Extraction Error: {str(e)}\n{traceback.format_exc()}"
             )
 
-    def _parse_application(self, root: ET._Element) -> Dict:
+    def _syntax_failure(self, file_path: str, error: ET.XMLSyntaxError) -> AgentResult:
+        errors = syntax_errors(error)
+        return AgentResult(
+            agent_id="agent_2",
+            doc_id=os.path.basename(file_path),
+            status=ValidationStatus.FAILURE,
+            data={"xml_errors": errors},
+            comment=f"XML Syntax Error: {len(errors)} ошибок: {format_errors(errors)}"
+        )
+
+    def _parse_application(self, root: ET._Element) -> ApplicationRecord:
         # На основе "Заявление о выдаче лицензии.xml"
         ns = {"ns": "http://asguf.mos.ru/rkis_gu/coordinate/v6_1/"}
         
         declarant = root.find(".//ns:BaseDeclarant", namespaces=ns)
         if declarant is None:
-            return {}
+            return ApplicationRecord()
 
         inn = declarant.findtext("ns:Inn", namespaces=ns)
         kpp = declarant.findtext("ns:Kpp", namespaces=ns)
+        ogrn = declarant.findtext("ns:Ogrn", namespaces=ns)
         name = declarant.findtext("ns:FullName", namespaces=ns)
         
         objects = []
         # Список обособленных подразделений
         for div in root.xpath(".//*[local-name()='separate_division']"):
-            objects.append({
-                "address": div.findtext(".//pobox") or div.findtext(".//street"),
-                "cadastral_number": div.findtext(".//cadastral_number"),
-                "name": div.findtext(".//name_unit")
-            })
+            objects.append(ObjectRecord(
+                address=div.findtext(".//pobox") or self._compose_object_address(div),
+                cadastral_number=div.findtext(".//cadastral_number"),
+                name=div.findtext(".//name_unit"),
+                fias_id=div.findtext(".//fiascode"),
+                kpp=div.findtext(".//reason_code")
+            ))
             
-        return {
-            "inn": inn,
-            "kpp": kpp,
-            "company_name": name,
-            "objects": objects
-        }
-
-    def _parse_egrul(self, root: ET._Element) -> Dict:
+        return ApplicationRecord(
+            inn=inn,
+            kpp=kpp,
+            company_name=name,
+            objects=tuple(objects),
+            ogrn=ogrn
+        )
+
+    def _compose_object_address(self, div: ET._Element) -> Optional[str]:
+        # Если pobox не заполнен, адрес собирается из населенного пункта, улицы и дома
+        house = div.findtext(".//house")
+        return compose_address(
+            div.findtext(".//locality"),
+            div.findtext(".//street"),
+            f"д {house.strip()}" if house and house.strip() else None
+        )
+
+    def _parse_egrul(self, root: ET._Element) -> EgrulRecord:
         # XML ЕГРЮЛ использует атрибуты для ИНН/КПП
         sv_ul_list = root.xpath(".//*[local-name()='СвЮЛ']")
         if not sv_ul_list:
-            return {}
+            return EgrulRecord()
         sv_ul = sv_ul_list[0]
             
         inn = sv_ul.get("ИНН")
         kpp = sv_ul.get("КПП")
+        ogrn = sv_ul.get("ОГРН")
         
         # Имя находится в СвНаимЮЛ/@НаимЮЛПолн
         name_elem_list = root.xpath(".//*[local-name()='СвНаимЮЛ']")
         name = name_elem_list[0].get("НаимЮЛПолн") if name_elem_list else ""
+
+        # Место нахождения самого ЮЛ и все обособленные подразделения с их адресами и КПП
+        subdivisions = []
+        head_address = sv_ul.xpath("./*[local-name()='СвАдресЮЛ']")
+        if head_address:
+            subdivisions.append(self._parse_egrul_location(head_address[0], "HEAD", name, kpp))
+        for kind, tag in EGRUL_SUBDIVISION_TAGS:
+            for elem in sv_ul.xpath(f".//*[local-name()='{tag}']"):
+                sub_name = elem.xpath("string(./*[local-name()='СвНаим']/@НаимПолн)") or None
+                # КПП подразделения — в его собственных сведениях об учете, а не в любом вложенном блоке
+                sub_kpp = elem.get("КПП") or elem.xpath(
+                    "string(./*[local-name()='СвУчетНОФилиал' or local-name()='СвУчетНОПредстав']/@КПП)"
+                ) or None
+                subdivisions.append(self._parse_egrul_location(elem, kind, sub_name, sub_kpp))
             
-        return {
-            "inn": inn,
-            "kpp": kpp,
-            "company_name": name,
-            "status": "ACTIVE"
-        }
-
-    def _parse_fns(self, root: ET._Element) -> Dict:
+        return EgrulRecord(
+            inn=inn,
+            kpp=kpp,
+            company_name=name,
+            status="ACTIVE",
+            ogrn=ogrn,
+            subdivisions=tuple(subdivisions)
+        )
+
+    def _parse_egrul_location(self, elem: ET._Element, kind: str, name: Optional[str], kpp: Optional[str]) -> SubdivisionRecord:
+        # Адрес в ЕГРЮЛ задается в структуре ФИАС (СвАдрЮЛФИАС/СвАдрМНФИАС) и/или КЛАДР (АдресРФ/АдрМНРФ)
+        fias = elem.xpath(".//*[local-name()='СвАдрЮЛФИАС' or local-name()='СвАдрМНФИАС']")
+        kladr = elem.xpath(".//*[local-name()='АдресРФ' or local-name()='АдрМНРФ']")
+        address = None
+        if fias:
+            address = self._format_fias_address(fias[0])
+        elif kladr:
+            address = self._format_kladr_address(kladr[0])
+        return SubdivisionRecord(
+            kind=kind,
+            name=name,
+            address=address,
+            fias_id=fias[0].get("ИдНом") if fias else None,
+            kpp=kpp
+        )
+
+    def _format_fias_address(self, elem: ET._Element) -> Optional[str]:
+        parts = [elem.xpath("string(./*[local-name()='НаимРегион'])")]
+        for child in elem:
+            if not isinstance(child.tag, str):
+                continue
+            local = ET.QName(child).localname
+            if local in ("НаселенПункт", "ЭлПланСтруктур", "ЭлУлДорСети"):
+                parts.append(f"{child.get('Тип', '')} {child.get('Наим', '')}")
+            elif local in ("Здание", "ПомещЗдания", "ПомещКвартиры"):
+                parts.append(f"{child.get('Тип', '')} {child.get('Номер', '')}")
+        return compose_address(*parts)
+
+    def _format_kladr_address(self, elem: ET._Element) -> Optional[str]:
+        parts = [elem.xpath("string(./*[local-name()='Регион']/@НаимРегион)")]
+        for local, type_attr, name_attr in (("Город", "ТипГород", "НаимГород"),
+                                            ("НаселПункт", "ТипНаселПункт", "НаимНаселПункт"),
+                                            ("Улица", "ТипУлица", "НаимУлица")):
+            found = elem.xpath(f"./*[local-name()='{local}']")
+            if found:
+                parts.append(f"{found[0].get(type_attr, '')} {found[0].get(name_attr, '')}")
+        parts.extend([elem.get("Дом"), elem.get("Корпус"), elem.get("Кварт")])
+        return compose_address(*parts)
+
+    def _parse_fns(self, root: ET._Element) -> FnsDebtRecord:
         inf_resp_list = root.xpath(".//*[local-name()='INFZDLResponse']")
         if inf_resp_list:
              has_debt = inf_resp_list[0].get("ПрЗадолж") != "0"
-             return {"has_debt_over_3000": has_debt}
-        return {"has_debt_over_3000": False}
-
-    def _parse_rnip(self, root: ET._Element) -> Dict:
-        info_list = root.xpath(".//*[local-name()='PaymentInfo']")
-        amount = 0.0
-        if info_list:
-            amount_str = info_list[0].get("amount")
-            if amount_str:
-                amount = float(amount_str) / 100.0
-                
-        return {"amount": amount, "currency": "RUB"}
-
-    def _parse_rosreestr(self, root: ET._Element) -> Dict:
+             return FnsDebtRecord(has_debt_over_3000=has_debt)
+        return FnsDebtRecord(has_debt_over_3000=False)
+
+    def _parse_rosreestr(self, root: ET._Element) -> RosreestrRecord:
         cad_num = root.xpath(".//*[local-name()='cad_number']/text()")
         area = root.xpath(".//*[local-name()='area']/text()")
         purpose = root.xpath(".//*[local-name()='purpose']/*[local-name()='value']/text()")
         
-        return {
-            "cadastral_number": cad_num[0] if cad_num else None,
-            "area": area[0] if area else None,
-            "purpose": purpose[0] if purpose else None
-        }
+        return RosreestrRecord(
+            cadastral_number=cad_num[0] if cad_num else None,
+            area=area[0] if area else None,
+            purpose=purpose[0] if purpose else None
+        )
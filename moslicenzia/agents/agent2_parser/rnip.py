@@ -0,0 +1,78 @@
+import lxml.etree as ET
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+from moslicenzia.schemas.records import RnipChargeRecord, RnipGroupRecord, RnipPaymentRecord
+
+# Суммы в РНиП передаются в копейках
+KOPECKS_IN_RUBLE = 100.0
+
+
+def payer_inn_from_identifier(identifier: Optional[str]) -> Optional[str]:
+    """
+    Извлекает ИНН из идентификатора плательщика РНиП.
+    ЮЛ: "2" + "00" + ИНН(10) + КПП(9); ИП: "4" + "00" + ИНН(12).
+    """
+    if not identifier:
+        return None
+    if identifier.startswith("2") and len(identifier) == 22:
+        return identifier[3:13]
+    if identifier.startswith("4") and len(identifier) == 15:
+        return identifier[3:15]
+    return identifier
+
+
+def _release(elem: ET._Element) -> None:
+    # Освобождаем обработанный элемент и уже пройденных соседей, чтобы память не росла
+    elem.clear()
+    while elem.getprevious() is not None:
+        del elem.getparent()[0]
+
+
+def _aggregate(source: Union[str, BinaryIO], tag: str, amount_attrs: Tuple[str, ...],
+               skip_zero: bool = False) -> Tuple[int, float, Dict]:
+    """
+    Один проход iterparse по элементам tag с агрегацией сумм по (КБК, ИНН плательщика).
+    С skip_zero элементы с нулевой суммой не учитываются (погашенные начисления).
+    Память постоянна: в дереве держится только текущий элемент.
+    """
+    count = 0
+    total = 0.0
+    groups: Dict[Tuple[Optional[str], Optional[str]], RnipGroupRecord] = {}
+
+    for _, elem in ET.iterparse(source, events=("end",), tag=f"{{*}}{tag}"):
+        amount_str = next((elem.get(attr) for attr in amount_attrs if elem.get(attr)), None)
+        amount = float(amount_str) / KOPECKS_IN_RUBLE if amount_str else 0.0
+        if skip_zero and amount <= 0:
+            _release(elem)
+            continue
+
+        payer = elem.find("{*}Payer")
+        payer_inn = payer_inn_from_identifier(payer.get("payerIdentifier")) if payer is not None else None
+        kbk = elem.get("kbk")
+
+        group = groups.get((kbk, payer_inn))
+        if group is None:
+            group = groups[(kbk, payer_inn)] = RnipGroupRecord(kbk=kbk, payer_inn=payer_inn, purpose=elem.get("purpose"))
+        group.count += 1
+        group.amount += amount
+
+        count += 1
+        total += amount
+        _release(elem)
+
+    return count, total, groups
+
+
+def aggregate_payments(source: Union[str, BinaryIO]) -> RnipPaymentRecord:
+    """Агрегирует все PaymentInfo ответа РНиП «Сведения об оплатах»."""
+    count, total, groups = _aggregate(source, "PaymentInfo", ("amount",))
+    return RnipPaymentRecord(amount=total, currency="RUB", payments_count=count, groups=tuple(groups.values()))
+
+
+def aggregate_charges(source: Union[str, BinaryIO]) -> RnipChargeRecord:
+    """
+    Агрегирует все ChargeInfo ответа РНиП «Сведения о начислениях».
+    Неоплаченный остаток берется из amountToPay, при его отсутствии — из totalAmount.
+    Погашенные начисления (остаток 0) не входят ни в число, ни в группы.
+    """
+    count, total, groups = _aggregate(source, "ChargeInfo", ("amountToPay", "totalAmount"), skip_zero=True)
+    return RnipChargeRecord(outstanding_amount=total, currency="RUB", charges_count=count, groups=tuple(groups.values()))
@@ -0,0 +1,157 @@
+import os
+import threading
+import lxml.etree as ET
+from enum import Enum
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from moslicenzia.schemas.models import DocType
+
+# Каталог XSD-схем: файл <DocType.value>.xsd на каждый тип документа (напр. EGRUL.xsd)
+XSD_DIR = os.environ.get(
+    "MOSLICENZIA_XSD_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../schemas/xsd"))
+)
+
+# Ограничение числа ошибок в отчете, чтобы сильно поврежденный документ не раздувал результат
+MAX_REPORTED_ERRORS = 50
+
+# Потоковая проверка libxml2 не сообщает строку и путь ошибки схемы. Документ, не прошедший ее,
+# проверяется повторно по дереву, чтобы указать место ошибок, если он не больше этого размера
+STREAM_LOCATE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class XsdValidationMode(str, Enum):
+    OFF = "off"                 # Валидация не выполняется
+    ALWAYS = "always"           # Каждый документ проверяется перед извлечением данных
+    ON_FAILURE = "on_failure"   # Схема проверяется только если извлечение упало
+
+
+# Процессный кэш скомпилированных схем: компиляция XSD на порядки дороже валидации.
+# Объект XMLSchema хранит error_log последней проверки, поэтому валидация по одной схеме
+# сериализуется отдельной блокировкой.
+_SCHEMA_CACHE: Dict[str, Tuple[ET.XMLSchema, threading.Lock]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def schema_path(doc_type: DocType) -> str:
+    return os.path.join(XSD_DIR, f"{doc_type.value}.xsd")
+
+
+def get_schema(doc_type: DocType) -> Optional[Tuple[ET.XMLSchema, threading.Lock]]:
+    """Возвращает скомпилированную схему из кэша (компилирует при первом обращении) или None."""
+    path = schema_path(doc_type)
+    entry = _SCHEMA_CACHE.get(path)
+    if entry is not None:
+        return entry
+
+    with _CACHE_LOCK:
+        entry = _SCHEMA_CACHE.get(path)
+        if entry is None:
+            if not os.path.exists(path):
+                return None
+            entry = (ET.XMLSchema(ET.parse(path)), threading.Lock())
+            _SCHEMA_CACHE[path] = entry
+    return entry
+
+
+def clear_schema_cache() -> None:
+    with _CACHE_LOCK:
+        _SCHEMA_CACHE.clear()
+
+
+def validate_tree(doc_type: DocType, root: ET._Element) -> Optional[List[Dict]]:
+    """
+    Проверяет уже разобранное дерево по XSD типа документа.
+    Возвращает список структурированных ошибок (пустой, если документ валиден)
+    или None, если схема для типа документа не задана.
+    """
+    entry = get_schema(doc_type)
+    if entry is None:
+        return None
+
+    schema, lock = entry
+    with lock:
+        return _tree_errors(schema, root)
+
+
+def _tree_errors(schema: ET.XMLSchema, root: ET._Element) -> List[Dict]:
+    if schema.validate(root):
+        return []
+    return [
+        {
+            "line": error.line,
+            "column": error.column,
+            "path": error.path,
+            "type": error.type_name,
+            "message": error.message,
+        }
+        for error in list(schema.error_log)[:MAX_REPORTED_ERRORS]
+    ]
+
+
+def _source_size(source: Union[str, BinaryIO]) -> int:
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def validate_stream(doc_type: DocType, source: Union[str, BinaryIO]) -> Optional[List[Dict]]:
+    """
+    Проверка по XSD потоковым разбором (iterparse со схемой) без построения дерева:
+    для ответов РНиП, которые извлекаются потоково. Документ с ошибками схемы (не больше
+    STREAM_LOCATE_MAX_BYTES) проверяется повторно по дереву, и ошибки получают строку,
+    столбец и путь, как в validate_tree. Возвращает None, если схема для типа документа не задана.
+    """
+    entry = get_schema(doc_type)
+    if entry is None:
+        return None
+
+    schema, lock = entry
+    with lock:
+        start = source.tell() if not isinstance(source, str) else 0
+        # Журнал ошибок lxml общий для потока: без очистки в исключение попадут ошибки прошлых разборов
+        ET.clear_error_log()
+        try:
+            for _, elem in ET.iterparse(source, events=("end",), schema=schema):
+                # Как при извлечении: в дереве держится только текущий элемент
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        except ET.XMLSyntaxError as e:
+            errors = syntax_errors(e)
+            # Ошибки синтаксиса XML приходят с позицией; ошибки схемы при потоковой проверке — без нее
+            entries = list(e.error_log)
+            schema_only = bool(entries) and all(error.domain == ET.ErrorDomains.SCHEMASV for error in entries)
+            if not schema_only or _source_size(source) > STREAM_LOCATE_MAX_BYTES:
+                return errors
+            if not isinstance(source, str):
+                source.seek(start)
+            try:
+                return _tree_errors(schema, ET.parse(source).getroot()) or errors
+            except ET.XMLSyntaxError:
+                return errors
+    return []
+
+
+def syntax_errors(exc: ET.XMLSyntaxError) -> List[Dict]:
+    """Структурированные ошибки разбора (некорректный XML или нарушение схемы при потоковой проверке)."""
+    errors = [
+        {
+            "line": error.line,
+            "column": error.column,
+            "path": error.path,
+            "type": error.type_name,
+            "message": error.message,
+        }
+        for error in list(exc.error_log)[:MAX_REPORTED_ERRORS]
+    ]
+    if not errors:
+        line, column = exc.position if exc.position else (None, None)
+        errors.append({"line": line, "column": column, "path": None, "type": type(exc).__name__, "message": exc.msg})
+    return errors
+
+
+def format_errors(errors: List[Dict]) -> str:
+    return "; ".join(f"строка {e['line']}: {e['message']}" for e in errors[:5])
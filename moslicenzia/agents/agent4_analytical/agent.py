@@ -1,29 +1,86 @@
 import os
-from typing import Dict, List, Any
-from langgraph.graph import StateGraph, END
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from moslicenzia.agents.agent4_analytical.state import ExpertiseState
 from moslicenzia.agents.agent1_reception.agent import ReceptionAgent
+from moslicenzia.agents.agent1_reception.archive import is_archive, iter_archive_members
 from moslicenzia.agents.agent2_parser.agent import ParserAgent
+from moslicenzia.agents.agent2_parser.xsd import XsdValidationMode
+from moslicenzia.agents.agent4_analytical.kpp_index import SubdivisionIndex
+from moslicenzia.agents.agent4_analytical.reconciliation import reconcile_objects
 from moslicenzia.agents.agent5_report.agent import ReportGeneratorAgent
+from moslicenzia.agents.agent6_mcp.client import MCP_URL, PersistentSession, open_session
 from moslicenzia.schemas.models import DocType, ValidationStatus, AgentResult
+from moslicenzia.schemas.records import ExtractionRecord, ObjectRecord
+
+# Результаты агентов, тип документа, извлеченная запись и текст ошибки
+DocumentOutcome = Tuple[List[AgentResult], Optional[DocType], Optional[ExtractionRecord], Optional[str]]
+
+# КБК госпошлины за выдачу лицензии на розничную продажу алкогольной продукции;
+# другие виды лицензий задаются списком через запятую в MOSLICENZIA_DUTY_KBK
+LICENSE_DUTY_KBK = "80910807082011000110"
+LICENSE_DUTY_KBKS = frozenset(
+    kbk.strip() for kbk in os.environ.get("MOSLICENZIA_DUTY_KBK", LICENSE_DUTY_KBK).split(",") if kbk.strip()
+)
+LICENSE_DUTY_AMOUNT = 65000.0
+
+# Члены архива крупнее этого порога разбираются параллельно в пуле потоков
+LARGE_MEMBER_BYTES = 256 * 1024
+
+def first_record(extracted: Dict[DocType, List[ExtractionRecord]], doc_type: DocType) -> Optional[ExtractionRecord]:
+    """Первый документ указанного типа (для типов, которые в пакете ожидаются в единственном экземпляре)."""
+    records = extracted.get(doc_type)
+    return records[0] if records else None
+
+def describe_registry_match(match: Dict[str, Any]) -> str:
+    m = {key: value or "Н/Д" for key, value in match.items()}
+    return (f"лицензия {m['license_number']} ({m['company_name']}, ИНН {m['inn']}), "
+            f"статус {m['status']} от {m['event_date']}. Основание: {m['reason']}")
+
+def kpp_finding(declared_kpp: Optional[str], expected_kpp: str, source: str) -> str:
+    if not declared_kpp:
+        return f"ПРЕДУПРЕЖДЕНИЕ: КПП для данного адреса в заявлении не указан, {source}: {expected_kpp}"
+    if declared_kpp != expected_kpp:
+        return f"КРИТИЧЕСКАЯ ОШИБКА: Несоответствие КПП для данного адреса. В заявлении: {declared_kpp}, {source}: {expected_kpp}"
+    return f"УСПЕХ: КПП {declared_kpp} соответствует учетным данным для этого адреса ({source})."
 
 class AnalyticalOrchestrator:
     """
     Агент 4: Центральный аналитический движок и оркестратор.
     Использует LangGraph для координации логики проверок.
     """
-    def __init__(self):
+    def __init__(self, archive_workers: int = 4, xsd_mode: XsdValidationMode = XsdValidationMode.OFF,
+                 registry_url: Optional[str] = None, mcp_url: Optional[str] = None,
+                 mcp_session: Optional[PersistentSession] = None, duty_kbks: Optional[Iterable[str]] = None):
+        self.archive_workers = archive_workers
+        # КБК, платежи по которым засчитываются в госпошлину
+        self.duty_kbks = frozenset(duty_kbks) if duty_kbks is not None else LICENSE_DUTY_KBKS
+        # Общий сервис Агента 6 (параметр или MOSLICENZIA_MCP_URL); без него — приватный сервер по stdio
+        self.mcp_url = mcp_url or MCP_URL
+        # Долгоживущая сессия (воркеры сервиса): без нее сессия открывается на каждое заявление
+        self.mcp_session = mcp_session
         self.reception = ReceptionAgent()
-        self.parser = ParserAgent()
+        self.parser = ParserAgent(xsd_mode=xsd_mode)
         self.reporter = ReportGeneratorAgent()
+        # Реестр отозванных лицензий подключается только если задан URL (параметр или MOSLICENZIA_REGISTRY_DB)
+        self.registry = None
+        registry_url = registry_url or os.environ.get("MOSLICENZIA_REGISTRY_DB")
+        if registry_url:
+            from moslicenzia.storage.registry import RevokedLicenseRegistry
+            self.registry = RevokedLicenseRegistry(registry_url)
         self.graph = self._build_graph()
 
     def _build_graph(self):
+        # LangGraph (и через него LangChain) импортируется лениво: модуль оркестратора
+        # подгружается CLI-командами, которым граф не нужен
+        from langgraph.graph import StateGraph, END
+
         builder = StateGraph(ExpertiseState)
         
         # Определение узлов
         builder.add_node("classify_and_parse", self.classify_and_parse_node)
         builder.add_node("cross_document_check", self.cross_document_check_node)
+        builder.add_node("registry_check", self.registry_check_node)
         builder.add_node("mcp_validation", self.mcp_validation_node)
         builder.add_node("finalize_expertise", self.finalize_expertise_node)
         builder.add_node("generate_report", self.generate_report_node)
@@ -31,16 +88,65 @@ class AnalyticalOrchestrator:
         # Определение ребер
         builder.set_entry_point("classify_and_parse")
         builder.add_edge("classify_and_parse", "cross_document_check")
-        builder.add_edge("cross_document_check", "mcp_validation")
+        builder.add_edge("cross_document_check", "registry_check")
+        builder.add_edge("registry_check", "mcp_validation")
         builder.add_edge("mcp_validation", "finalize_expertise")
         builder.add_edge("finalize_expertise", "generate_report")
         builder.add_edge("generate_report", END)
         
         return builder.compile()
 
+    def _process_document(self, path: str, content: Optional[bytes] = None) -> DocumentOutcome:
+        """
+        Классификация (Агент 1) и парсинг (Агент 2) одного документа.
+        """
+        results = []
+        # 1. Классификация
+        class_res = self.reception.classify_document(path, content=content)
+        results.append(class_res)
+
+        if class_res.status != ValidationStatus.SUCCESS:
+            return results, None, None, f"Ошибка классификации {os.path.basename(path)}: {class_res.comment}"
+
+        doc_type = class_res.data["doc_type"]
+        # 2. Парсинг
+        parse_res = self.parser.parse(doc_type, path, content=content)
+        results.append(parse_res)
+
+        if parse_res.status != ValidationStatus.SUCCESS:
+            return results, doc_type, None, f"Ошибка парсинга {doc_type}: {parse_res.comment}"
+        # Запись не копируется: результат Агента 2 и extracted_data ссылаются на один объект
+        return results, doc_type, parse_res.data["record"], None
+
+    def _process_archive(self, path: str) -> List[DocumentOutcome]:
+        """
+        Потоково обрабатывает члены ZIP-архива (включая вложенные архивы) без распаковки на диск.
+        Крупные члены разбираются параллельно; одновременно в памяти не более
+        archive_workers крупных членов, поэтому расход памяти не зависит от размера архива.
+        """
+        outcomes = []
+        in_flight = []
+        with ThreadPoolExecutor(max_workers=self.archive_workers) as pool:
+            for member_path, content in iter_archive_members(path):
+                if len(content) < LARGE_MEMBER_BYTES:
+                    outcomes.append(self._process_document(member_path, content))
+                    continue
+
+                if len(in_flight) >= self.archive_workers:
+                    index, future = in_flight.pop(0)
+                    outcomes[index] = future.result()
+                outcomes.append(None)
+                in_flight.append((len(outcomes) - 1, pool.submit(self._process_document, member_path, content)))
+                del content
+
+            for index, future in in_flight:
+                outcomes[index] = future.result()
+        return outcomes
+
     def classify_and_parse_node(self, state: ExpertiseState) -> Dict:
         """
         Запускает Агента 1 и Агента 2 для всех предоставленных документов.
+        ZIP-архивы разворачиваются в свои XML-документы.
         """
         results = []
         all_extracted = {}
@@ -48,22 +154,21 @@ class AnalyticalOrchestrator:
         
         for doc in state["documents"]:
             path = doc["path"]
-            # 1. Классификация
-            class_res = self.reception.classify_document(path)
-            results.append(class_res)
-            
-            if class_res.status == ValidationStatus.SUCCESS:
-                doc_type = class_res.data["doc_type"]
-                # 2. Парсинг
-                parse_res = self.parser.parse(doc_type, path)
-                results.append(parse_res)
-                
-                if parse_res.status == ValidationStatus.SUCCESS:
-                    all_extracted[doc_type] = parse_res.data
-                else:
-                    findings.append(f"Ошибка парсинга {doc_type}: {parse_res.comment}")
+            if is_archive(path):
+                outcomes = self._process_archive(path)
             else:
-                findings.append(f"Ошибка классификации {os.path.basename(path)}: {class_res.comment}")
+                outcomes = [self._process_document(path)]
+
+            for doc_results, doc_type, record, error in outcomes:
+                results.extend(doc_results)
+                for res in doc_results:
+                    if res.status == ValidationStatus.SUCCESS and res.data.get("xsd_errors"):
+                        findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Документ {res.doc_id} ({doc_type}) не соответствует XSD-схеме. {res.comment}")
+                if error:
+                    findings.append(error)
+                elif record is not None:
+                    # Пакет может содержать несколько документов одного типа (напр. выписки ЕГРН по каждому объекту)
+                    all_extracted.setdefault(doc_type, []).append(record)
 
         return {
             "extracted_data": all_extracted,
@@ -78,97 +183,190 @@ class AnalyticalOrchestrator:
         extracted = state["extracted_data"]
         findings = state["analysis_findings"]
         
-        app = extracted.get(DocType.APPLICATION)
-        egrul = extracted.get(DocType.EGRUL)
-        duty = extracted.get(DocType.RNIP_DUTY)
+        app = first_record(extracted, DocType.APPLICATION)
+        egrul = first_record(extracted, DocType.EGRUL)
+        duty = first_record(extracted, DocType.RNIP_DUTY)
         
         # Логика 1: Совпадение ИНН
         if app and egrul:
-            if app["inn"] != egrul["inn"]:
-                findings.append(f"КРИТИЧЕСКАЯ ОШИБКА: Несовпадение ИНН между заявлением ({app['inn']}) и ЕГРЮЛ ({egrul['inn']})")
+            if app.inn != egrul.inn:
+                findings.append(f"КРИТИЧЕСКАЯ ОШИБКА: Несовпадение ИНН между заявлением ({app.inn}) и ЕГРЮЛ ({egrul.inn})")
             else:
                 findings.append("УСПЕХ: ИНН в заявлении и ЕГРЮЛ совпадает.")
+        elif app:
+            findings.append("ПРЕДУПРЕЖДЕНИЕ: В пакете нет выписки ЕГРЮЛ (или она не разобрана), ИНН заявителя не сверен.")
         
-        # Логика 2: Проверка лицензионного сбора
+        # Логика 2: Проверка лицензионного сбора (платежи заявителя по КБК госпошлины)
         if duty:
-            if duty["amount"] < 65000.0:
-                findings.append(f"КРИТИЧЕСКАЯ ОШИБКА: Недостаточная сумма госпошлины: {duty['amount']} руб. (Ожидается 65000)")
+            applicant_inn = (app.inn if app else None) or (egrul.inn if egrul else None)
+            if applicant_inn is None:
+                findings.append("ПРЕДУПРЕЖДЕНИЕ: ИНН заявителя не установлен, плательщик госпошлины не проверен.")
+            paid = 0.0
+            for g in duty.groups:
+                if applicant_inn is not None and g.payer_inn != applicant_inn:
+                    findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Платеж третьего лица (ИНН {g.payer_inn or 'Н/Д'}, КБК {g.kbk or 'Н/Д'}) "
+                                    f"на сумму {g.amount} руб. не засчитан в госпошлину.")
+                elif g.kbk not in self.duty_kbks:
+                    findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Платеж заявителя по КБК {g.kbk or 'Н/Д'} на сумму {g.amount} руб. "
+                                    f"не относится к госпошлине за данный вид лицензии и не засчитан.")
+                else:
+                    paid += g.amount
+            if paid < LICENSE_DUTY_AMOUNT:
+                findings.append(f"КРИТИЧЕСКАЯ ОШИБКА: Недостаточная сумма госпошлины: {paid} руб. (Ожидается {LICENSE_DUTY_AMOUNT:.0f})")
+            else:
+                findings.append(f"УСПЕХ: Госпошлина в размере {paid} руб. подтверждена.")
+
+        # Логика 2.1: Неоплаченные начисления (штрафы) по данным РНиП
+        fines = first_record(extracted, DocType.RNIP_FINES)
+        if fines:
+            if fines.outstanding_amount > 0:
+                findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Имеются неоплаченные начисления РНиП: {fines.charges_count} шт. на сумму {fines.outstanding_amount} руб.")
             else:
-                findings.append(f"УСПЕХ: Госпошлина в размере {duty['amount']} руб. подтверждена.")
+                findings.append("УСПЕХ: Неоплаченные начисления (штрафы) в РНиП отсутствуют.")
         
-        # Логика 3: Проверка кадастрового номера объекта недвижимости
-        rosreestr = extracted.get(DocType.ROSREESTR)
+        # Логика 3: Сверка всех объектов заявления со всеми выписками ЕГРН (кадастровый номер, площадь, назначение)
+        rosreestr = extracted.get(DocType.ROSREESTR, [])
         if app and rosreestr:
-            app_cad = app["objects"][0]["cadastral_number"] if app["objects"] else None
-            real_cad = rosreestr["cadastral_number"]
-            if app_cad != real_cad:
-                 findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Несовпадение кадастровых номеров. Заявлено: {app_cad}, В Росреестре: {real_cad}")
-            else:
-                 findings.append(f"УСПЕХ: Кадастровый номер объекта {app_cad} подтвержден.")
+            findings.extend(reconcile_objects(app.objects, rosreestr))
 
         return {"analysis_findings": findings}
 
+    def registry_check_node(self, state: ExpertiseState) -> Dict:
+        """
+        Проверяет заявителя, обособленные подразделения объектов (ИНН + заявленный КПП)
+        и адреса объектов по локальному реестру отозванных лицензий.
+        """
+        findings = state["analysis_findings"]
+        if self.registry is None:
+            return {"analysis_findings": findings}
+
+        extracted = state["extracted_data"]
+        app = first_record(extracted, DocType.APPLICATION)
+        egrul = first_record(extracted, DocType.EGRUL)
+        applicant = app or egrul
+        if applicant is None:
+            return {"analysis_findings": findings}
+
+        # Записи по подразделению объекта (ИНН + КПП) выводятся отдельно от записей организации
+        subdivision_findings = []
+        subdivision_ids = set()
+        seen_kpp = set()
+        for obj in (app.objects if app else ()):
+            if not obj.kpp or not applicant.inn or obj.kpp in seen_kpp:
+                continue
+            seen_kpp.add(obj.kpp)
+            for match in self.registry.lookup(inn=applicant.inn, kpp=obj.kpp):
+                subdivision_ids.add(match["id"])
+                subdivision_findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Обособленное подразделение (КПП {obj.kpp}) найдено в реестре "
+                                            f"отозванных лицензий: {describe_registry_match(match)}")
+
+        registry_findings = []
+        for match in self.registry.lookup(inn=applicant.inn, ogrn=applicant.ogrn):
+            if match["id"] in subdivision_ids:
+                continue
+            registry_findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Заявитель найден в реестре отозванных лицензий: {describe_registry_match(match)}")
+        registry_findings += subdivision_findings
+
+        for obj in (app.objects if app else ()):
+            for match in self.registry.lookup(address=obj.address):
+                if match["inn"] == applicant.inn:
+                    continue  # уже отражено выше
+                registry_findings.append(f"ПРЕДУПРЕЖДЕНИЕ: По адресу объекта «{obj.address}» в реестре отозванных лицензий: {describe_registry_match(match)}")
+
+        if not registry_findings:
+            registry_findings.append("УСПЕХ: Заявитель и адреса объектов не найдены в реестре отозванных лицензий.")
+        return {"analysis_findings": findings + registry_findings}
+
     def mcp_validation_node(self, state: ExpertiseState) -> Dict:
         """
-        Вызывает Агента 6 (MCP) для валидации адреса и КПП.
+        Вызывает Агента 6 (MCP) для валидации адресов объектов в ФИАС.
+        КПП подразделения по адресу определяется локально по выписке ЕГРЮЛ;
+        к MCP-инструменту get_subdivision_kpp обращаемся только для адресов, которых в выписке нет.
         """
         import asyncio
-        from mcp import ClientSession, StdioServerParameters
-        from mcp.client.stdio import stdio_client
+        import json
         
         findings = state["analysis_findings"]
         extracted = state["extracted_data"]
-        app = extracted.get(DocType.APPLICATION)
+        app = first_record(extracted, DocType.APPLICATION)
         
         if not app:
             return {"analysis_findings": findings + ["ПРЕДУПРЕЖДЕНИЕ: Нет данных заявления для проверки в ФИАС."]}
 
-        # Адрес из заявления
-        obj = app["objects"][0] if app["objects"] else {}
-        address_query = obj.get("address", "")
+        objects = list(app.objects) or [ObjectRecord()]
+        subdivisions = SubdivisionIndex.from_egrul(extracted.get(DocType.EGRUL, []))
+
+        # КПП по данным ЕГРЮЛ: не требует сетевых вызовов и не зависит от доступности MCP
+        local_findings = []
+        unresolved = []
+        for i, obj in enumerate(objects):
+            subdivision = subdivisions.lookup(fias_id=obj.fias_id, address=obj.address)
+            if subdivision is not None:
+                local_findings.append(kpp_finding(obj.kpp or app.kpp, subdivision.kpp, "по данным ЕГРЮЛ"))
+            else:
+                unresolved.append(i)
         
-        async def run_mcp_check():
-            server_params = StdioServerParameters(
-                command="py",
-                args=["moslicenzia/agents/agent6_mcp/server.py"]
-            )
+        async def run_mcp_check(session):
+            mcp_findings = []
+
+            # 1. Проверка адресов одним пакетным вызовом: совпадающие по ключу адреса
+            # разных объектов проверяются в ФИАС один раз
+            address_queries = [obj.address or "" for obj in objects]
+            res_addr = await session.call_tool("check_addresses_fias", {"address_queries": address_queries})
+            batch = json.loads(res_addr.content[0].text) if res_addr.content else {}
+            addr_results = batch.get("results") or [{} for _ in objects]
+            kpp_by_fias: Dict[str, Optional[str]] = {}
+
+            for i, (obj, addr_data) in enumerate(zip(objects, addr_results)):
+                address_query = address_queries[i]
+                fias_id = addr_data.get("fias_id")
+            
+                if addr_data.get("status") not in ["VALID", "VALID_MOCK"]:
+                    mcp_findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Адрес не найден или не валиден в ФИАС: {address_query}")
+                    continue
+                mcp_findings.append(f"УСПЕХ: Адрес подтвержден в ФИАС: {addr_data.get('normalized_address')}")
+
+                # 2. КПП для адреса, которого нет в выписке ЕГРЮЛ
+                if i not in unresolved or not fias_id:
+                    continue
+                subdivision = subdivisions.lookup(fias_id=fias_id)
+                if subdivision is not None:
+                    mcp_findings.append(kpp_finding(obj.kpp or app.kpp, subdivision.kpp, "по данным ЕГРЮЛ"))
+                    continue
+                if fias_id not in kpp_by_fias:
+                    res_kpp = await session.call_tool("get_subdivision_kpp", {"fias_id": fias_id})
+                    kpp_by_fias[fias_id] = res_kpp.content[0].text if res_kpp.content else None
+                expected_kpp = kpp_by_fias[fias_id]
+                if expected_kpp:
+                    mcp_findings.append(kpp_finding(obj.kpp or app.kpp, expected_kpp, "по данным налоговой"))
             
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    
-                    # 1. Проверка адреса
-                    res_addr = await session.call_tool("check_address_fias", {"address_query": address_query})
-                    addr_data = json.loads(res_addr.content[0].text) if res_addr.content else {}
-                    
-                    mcp_findings = []
-                    fias_id = addr_data.get("fias_id")
-                    
-                    if addr_data.get("status") in ["VALID", "VALID_MOCK"]:
-                        mcp_findings.append(f"УСПЕХ: Адрес подтвержден в ФИАС: {addr_data.get('normalized_address')}")
-                        
-                        # 2. Проверка КПП для этого адреса
-                        if fias_id:
-                            res_kpp = await session.call_tool("get_subdivision_kpp", {"fias_id": fias_id})
-                            expected_kpp = res_kpp.content[0].text if res_kpp.content else None
-                            
-                            app_kpp = app.get("kpp")
-                            if expected_kpp and app_kpp and expected_kpp != app_kpp:
-                                mcp_findings.append(f"КРИТИЧЕСКАЯ ОШИБКА: Несоответствие КПП для данного адреса. В заявлении: {app_kpp}, По данным налоговой: {expected_kpp}")
-                            elif expected_kpp:
-                                mcp_findings.append(f"УСПЕХ: КПП {app_kpp} соответствует учетным данным для этого адреса.")
-                    else:
-                        mcp_findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Адрес не найден или не валиден в ФИАС: {address_query}")
-                        
-                    return mcp_findings
+            return mcp_findings
+
+        async def run_private_session():
+            async with open_session(self.mcp_url) as session:
+                return await run_mcp_check(session)
 
         try:
-            # Запуск асинхронного MCP-клиента в синхронном узле
-            import json
-            mcp_results = asyncio.run(run_mcp_check())
-            return {"analysis_findings": findings + mcp_results}
+            if self.mcp_session is not None:
+                mcp_results = self._run_persistent(run_mcp_check)
+            else:
+                # Запуск асинхронного MCP-клиента в синхронном узле
+                mcp_results = asyncio.run(run_private_session())
+            return {"analysis_findings": findings + local_findings + mcp_results}
         except Exception as e:
-            return {"analysis_findings": findings + [f"ОШИБКА: Сбой сервиса MCP/ФИАС: {str(e)}"]}
+            # Адреса не проверены: заявление не может быть одобрено без уточнения
+            return {"analysis_findings": findings + local_findings + [
+                f"ПРЕДУПРЕЖДЕНИЕ: Сбой сервиса MCP/ФИАС, адреса объектов не проверены: {str(e)}"]}
+
+    def _run_persistent(self, fn):
+        """
+        Вызов в долгоживущей MCP-сессии. Сессия, упавшая после прошлого задания или
+        на этом вызове (перезапуск сервера Агента 6), открывается заново; вызов повторяется один раз.
+        """
+        try:
+            return self.mcp_session.ensure_open().run(fn)
+        except Exception:
+            return self.mcp_session.ensure_open().run(fn)
 
     def finalize_expertise_node(self, state: ExpertiseState) -> Dict:
         """
@@ -179,7 +377,8 @@ class AnalyticalOrchestrator:
         
         if any("КРИТИЧЕСКАЯ" in f for f in findings):
             status = ValidationStatus.FAILURE
-        elif any("ПРЕДУПРЕЖДЕНИЕ" in f for f in findings):
+        # Сбой проверки (ОШИБКА) не дает одобрить заявление
+        elif any("ПРЕДУПРЕЖДЕНИЕ" in f or f.startswith("ОШИБКА") for f in findings):
             status = ValidationStatus.WARNING
             
         recommendation = "Одобрить" if status == ValidationStatus.SUCCESS else "Отказать"
@@ -202,8 +401,8 @@ class AnalyticalOrchestrator:
             "decision_draft": report_res.data.get("report") if report_res.status == ValidationStatus.SUCCESS else state["decision_draft"]
         }
 
-    def run_expertise(self, documents: List[Dict[str, str]], app_id: str = "REQ-001"):
-        initial_state = {
+    def _initial_state(self, documents: List[Dict[str, str]], app_id: str) -> Dict[str, Any]:
+        return {
             "application_id": app_id,
             "documents": documents,
             "extracted_data": {},
@@ -214,4 +413,18 @@ class AnalyticalOrchestrator:
             "decision_draft": "",
             "next_action": None
         }
-        return self.graph.invoke(initial_state)
+
+    def run_expertise(self, documents: List[Dict[str, str]], app_id: str = "REQ-001"):
+        return self.graph.invoke(self._initial_state(documents, app_id))
+
+    def stream_expertise(self, documents: List[Dict[str, str]], app_id: str = "REQ-001") -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Выполняет экспертизу по шагам: после каждого узла графа возвращает (имя узла, состояние).
+        Последнее состояние совпадает с результатом run_expertise.
+        """
+        state = self._initial_state(documents, app_id)
+        for chunk in self.graph.stream(state, stream_mode="updates"):
+            for node, update in chunk.items():
+                # У полей состояния нет редьюсеров: обновление узла заменяет значения
+                state = {**state, **(update or {})}
+                yield node, state
@@ -0,0 +1,45 @@
+from typing import Dict, Iterable, Optional
+from moslicenzia.address import address_key
+from moslicenzia.schemas.records import EgrulRecord, SubdivisionRecord
+
+
+class SubdivisionIndex:
+    """
+    Индекс мест нахождения организации и ее обособленных подразделений по данным ЕГРЮЛ.
+    Позволяет определить КПП для адреса объекта локально, без обращения к MCP-сервису.
+    Ключи: идентификатор ФИАС (ИдНом) и канонический ключ адреса.
+    """
+
+    def __init__(self):
+        self._by_fias: Dict[str, SubdivisionRecord] = {}
+        self._by_address: Dict[str, SubdivisionRecord] = {}
+
+    @classmethod
+    def from_egrul(cls, records: Iterable[EgrulRecord]) -> "SubdivisionIndex":
+        index = cls()
+        for record in records:
+            for subdivision in record.subdivisions:
+                index.add(subdivision)
+        return index
+
+    def add(self, subdivision: SubdivisionRecord) -> None:
+        # Без КПП запись бесполезна для сверки; первая запись по ключу побеждает
+        if not subdivision.kpp:
+            return
+        if subdivision.fias_id:
+            self._by_fias.setdefault(subdivision.fias_id.lower(), subdivision)
+        key = address_key(subdivision.address)
+        if key:
+            self._by_address.setdefault(key, subdivision)
+
+    def __len__(self) -> int:
+        return len(set(map(id, self._by_fias.values())) | set(map(id, self._by_address.values())))
+
+    def lookup(self, fias_id: Optional[str] = None, address: Optional[str] = None) -> Optional[SubdivisionRecord]:
+        """Ищет подразделение сначала по идентификатору ФИАС, затем по адресу."""
+        if fias_id:
+            found = self._by_fias.get(fias_id.lower())
+            if found is not None:
+                return found
+        key = address_key(address)
+        return self._by_address.get(key) if key else None
@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, List, Optional
+from moslicenzia.schemas.records import ObjectRecord, RosreestrRecord
+
+
+def normalize_cadastral_number(cad_num: Optional[str]) -> Optional[str]:
+    """
+    Приводит кадастровый номер к каноническому виду: без пробелов и ведущих нулей
+    в кварталах ("77:05:0002002:4416" и "77:5:2002:4416" дают один ключ).
+    """
+    if not cad_num:
+        return None
+    parts = "".join(cad_num.split()).split(":")
+    return ":".join(part.lstrip("0") or "0" for part in parts)
+
+
+def build_cadastral_index(extracts: Iterable[RosreestrRecord]) -> Dict[str, RosreestrRecord]:
+    """Индекс выписок ЕГРН по нормализованному кадастровому номеру (первая выписка побеждает)."""
+    index = {}
+    for extract in extracts:
+        key = normalize_cadastral_number(extract.cadastral_number)
+        if key:
+            index.setdefault(key, extract)
+    return index
+
+
+def _check_extract(label: str, extract: RosreestrRecord) -> List[str]:
+    findings = []
+    # Площадь в заявлении не указывается, поэтому она не сверяется: проверяется только,
+    # что выписка ЕГРН содержит корректную площадь
+    try:
+        area = float(extract.area) if extract.area else None
+    except ValueError:
+        area = None
+    if area is None or area <= 0:
+        findings.append(f"ПРЕДУПРЕЖДЕНИЕ: {label}: площадь в выписке ЕГРН не указана или некорректна ({extract.area}).")
+    else:
+        findings.append(f"УСПЕХ: {label}: площадь указана в выписке ЕГРН ({extract.area} кв.м.), "
+                        f"в заявлении площадь не указывается.")
+
+    # Назначение: розничная продажа алкоголя допускается только в нежилых помещениях
+    purpose = extract.purpose or ""
+    if "нежил" in purpose.lower():
+        findings.append(f"УСПЕХ: {label}: назначение объекта «{purpose}».")
+    else:
+        findings.append(f"ПРЕДУПРЕЖДЕНИЕ: {label}: назначение объекта «{purpose or 'не указано'}» не подтверждает нежилой статус.")
+    return findings
+
+
+def reconcile_objects(objects: Iterable[ObjectRecord], extracts: List[RosreestrRecord]) -> List[str]:
+    """
+    Сверяет все обособленные подразделения заявления со всеми выписками ЕГРН.
+    Хеш-соединение по нормализованному кадастровому номеру: O(n + m) вместо O(n * m).
+    Выписки, не сопоставленные ни одному объекту (в том числе при заявлении без объектов),
+    дают предупреждение.
+    """
+    index = build_cadastral_index(extracts)
+    objects = list(objects)
+    findings = []
+    if not objects and extracts:
+        findings.append(f"ПРЕДУПРЕЖДЕНИЕ: В заявлении не указаны объекты (обособленные подразделения), "
+                        f"выписки ЕГРН ({len(extracts)} шт.) не с чем сверить.")
+    matched = set()
+    for i, obj in enumerate(objects, start=1):
+        label = f"Объект {i} ({obj.name or 'без наименования'})"
+        key = normalize_cadastral_number(obj.cadastral_number)
+        if key is None:
+            findings.append(f"ПРЕДУПРЕЖДЕНИЕ: {label}: кадастровый номер в заявлении не указан.")
+            continue
+
+        extract = index.get(key)
+        if extract is None:
+            findings.append(f"ПРЕДУПРЕЖДЕНИЕ: {label}: кадастровый номер {obj.cadastral_number} не найден среди выписок ЕГРН ({len(extracts)} шт.).")
+            continue
+
+        matched.add(key)
+        findings.append(f"УСПЕХ: {label}: кадастровый номер {obj.cadastral_number} подтвержден.")
+        findings.extend(_check_extract(label, extract))
+
+    if objects:
+        for key, extract in index.items():
+            if key not in matched:
+                findings.append(f"ПРЕДУПРЕЖДЕНИЕ: Выписка ЕГРН на объект {extract.cadastral_number} "
+                                f"не соответствует ни одному объекту заявления.")
+    return findings
@@ -1,7 +1,8 @@
 from typing import Annotated, List, Dict, Any, Optional
 from typing_extensions import TypedDict
 from pydantic import BaseModel
-from moslicenzia.schemas.models import AgentResult, ValidationStatus
+from moslicenzia.schemas.models import AgentResult, DocType, ValidationStatus
+from moslicenzia.schemas.records import ExtractionRecord
 
 class ExpertiseState(TypedDict):
     """
@@ -9,8 +10,8 @@ class ExpertiseState(TypedDict):
     """
     application_id: str
     documents: List[Dict[str, str]]  # List of {path, type}
-    extracted_data: Dict[str, Any]  # Data from Agent 2 and Agent 3
-    agent_results: List[AgentResult]
+    extracted_data: Dict[DocType, List[ExtractionRecord]]  # Typed records from Agent 2 and Agent 3, per document
+    agent_results: List[AgentResult]  # Agent 2 results reference the same records, not copies
     analysis_findings: List[str]
     overall_status: ValidationStatus
     recommendation: str
@@ -1,8 +1,7 @@
 import os
 from datetime import datetime
 from typing import Dict, Any, List
-from jinja2 import Template
-from moslicenzia.schemas.models import AgentResult, ValidationStatus
+from moslicenzia.schemas.models import AgentResult, DocType, ValidationStatus
 
 REPORT_TEMPLATE = """
 # ЗАКЛЮЧЕНИЕ ПО ПРЕДВАРИТЕЛЬНОЙ ЭКСПЕРТИЗЕ № {{ app_id }}
@@ -43,16 +42,18 @@ class ReportGeneratorAgent:
     Создает официальные документы на основе выводов Агента 4.
     """
     def generate_text_report(self, state: Dict[str, Any]) -> str:
+        from jinja2 import Template
+
         extracted = state.get("extracted_data", {})
-        app_data = extracted.get("APPLICATION", {})
+        app = (extracted.get(DocType.APPLICATION) or [None])[0]
         
         template = Template(REPORT_TEMPLATE)
         report = template.render(
             app_id=state.get("application_id", "Unknown"),
             date=datetime.now().strftime("%d.%m.%Y %H:%M"),
-            company_name=app_data.get("company_name", "Н/Д"),
-            inn=app_data.get("inn", "Н/Д"),
-            kpp=app_data.get("kpp", "Н/Д"),
+            company_name=app.company_name if app else "Н/Д",
+            inn=app.inn if app else "Н/Д",
+            kpp=app.kpp if app else "Н/Д",
             findings=state.get("analysis_findings", []),
             status=state.get("overall_status", "UNKNOWN"),
             recommendation=state.get("recommendation", "Н/Д"),
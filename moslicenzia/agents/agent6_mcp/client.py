@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# Адрес общего сервиса Агента 6 (streamable-HTTP: http://host:port/mcp, SSE: http://host:port/sse).
+# Если не задан, каждый оркестратор запускает собственный сервер по stdio.
+MCP_URL = os.environ.get("MOSLICENZIA_MCP_URL")
+
+# Приватный сервер запускается тем же интерпретатором, что и оркестратор (venv, любая ОС)
+SERVER_COMMAND = sys.executable
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+
+@asynccontextmanager
+async def open_session(url: Optional[str] = None, command: str = SERVER_COMMAND,
+                       args: Optional[List[str]] = None,
+                       env: Optional[Dict[str, str]] = None) -> AsyncIterator["ClientSession"]:
+    """
+    Открывает инициализированную MCP-сессию с Агентом 6.
+    С url подключается к общему сервису (транспорт выбирается по пути: /sse — SSE,
+    иначе streamable-HTTP), без url запускает приватный сервер по stdio.
+    """
+    from mcp import ClientSession
+
+    if url:
+        if url.rstrip("/").endswith("/sse"):
+            from mcp.client.sse import sse_client
+            transport = sse_client(url)
+        else:
+            from mcp.client.streamable_http import streamablehttp_client
+            transport = streamablehttp_client(url)
+    else:
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        # Без env клиент MCP передает серверу урезанное окружение; настройки MOSLICENZIA_* должны дойти до Агента 6
+        transport = stdio_client(StdioServerParameters(
+            command=command, args=args or [SERVER_SCRIPT], env=env if env is not None else dict(os.environ),
+        ))
+
+    async with transport as streams:
+        # streamable-HTTP дополнительно отдает функцию получения идентификатора сессии
+        read, write = streams[0], streams[1]
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+class PersistentSession:
+    """
+    MCP-сессия, открытая на весь срок жизни процесса (для долгоживущих воркеров).
+    Сессия живет в собственном цикле событий в фоновом потоке: сервер по stdio
+    запускается и инициализируется один раз, синхронный код выполняет в сессии
+    корутины через run(). Сбой вызова (завершился сервер по stdio, перезапущен общий
+    сервис) помечает сессию неработающей; ensure_open() открывает ее заново.
+    """
+
+    def __init__(self, url: Optional[str] = None, command: str = SERVER_COMMAND,
+                 args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+                 timeout: float = 60.0):
+        self.url = url
+        self.command = command
+        self.args = args
+        self.env = env
+        self.timeout = timeout
+        self.session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._closing: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+        self._broken = False
+        self._reopen_lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return (self.session is not None and not self._broken
+                and self._thread is not None and self._thread.is_alive())
+
+    def start(self) -> "PersistentSession":
+        self._ready.clear()
+        self._error = None
+        self._broken = False
+        self._thread = threading.Thread(target=self._run_loop, name="mcp-session", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(self.timeout):
+            raise TimeoutError("MCP-сессия не открылась за отведенное время")
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._hold())
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+            self._loop.close()
+
+    async def _hold(self) -> None:
+        # Вход и выход из транспорта должны происходить в одной задаче (группы задач anyio)
+        self._closing = asyncio.Event()
+        async with open_session(self.url, command=self.command, args=self.args, env=self.env) as session:
+            self.session = session
+            self._ready.set()
+            await self._closing.wait()
+
+    def run(self, fn: Callable[[Any], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Выполняет корутину fn(session) в цикле сессии и возвращает ее результат."""
+        if not self.alive:
+            raise RuntimeError("MCP-сессия закрыта")
+        future = asyncio.run_coroutine_threadsafe(fn(self.session), self._loop)
+        try:
+            return future.result(timeout or self.timeout)
+        except BaseException:
+            future.cancel()
+            self._broken = True
+            raise
+
+    def ensure_open(self) -> "PersistentSession":
+        """Открывает сессию заново, если она закрыта или последний вызов завершился сбоем."""
+        with self._reopen_lock:
+            if not self.alive:
+                self.close()
+                self.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        if self._loop is not None and self._closing is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._closing.set)
+        self._thread.join(self.timeout)
+        self._thread = None
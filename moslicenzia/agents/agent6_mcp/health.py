@@ -0,0 +1,142 @@
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Сглаживание EWMA: вес нового замера
+EWMA_ALPHA = 0.2
+# Число ошибок подряд, после которого эндпоинт исключается (цепь размыкается)
+FAILURE_THRESHOLD = 3
+# Пауза перед пробным запросом к исключенному эндпоинту; удваивается после неудачной пробы
+OPEN_COOLDOWN_SECONDS = 60.0
+MAX_COOLDOWN_SECONDS = 3600.0
+# Нижняя граница доли успехов при ранжировании, чтобы оценка не уходила в бесконечность
+MIN_SUCCESS_RATE = 0.05
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"         # Эндпоинт здоров, запросы идут
+    OPEN = "open"             # Эндпоинт исключен до истечения паузы
+    HALF_OPEN = "half_open"   # Пауза истекла, пропускается один пробный запрос
+
+
+class EndpointHealth:
+    """Состояние одного эндпоинта ФИАС: доля успехов, EWMA задержки и автомат circuit breaker."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.state = CircuitState.CLOSED
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.success_rate: Optional[float] = None   # EWMA доли успешных ответов
+        self.latency_ewma: Optional[float] = None   # EWMA задержки, секунды
+        self.cooldown = OPEN_COOLDOWN_SECONDS
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.last_error: Optional[str] = None
+
+    def _observe(self, ok: bool, latency: float) -> None:
+        self.requests += 1
+        sample = 1.0 if ok else 0.0
+        if self.success_rate is None:
+            self.success_rate = sample
+            self.latency_ewma = latency
+        else:
+            self.success_rate += EWMA_ALPHA * (sample - self.success_rate)
+            self.latency_ewma += EWMA_ALPHA * (latency - self.latency_ewma)
+
+    def score(self) -> float:
+        """Ожидаемая «цена» запроса: задержка с поправкой на долю успехов (меньше — лучше)."""
+        if self.latency_ewma is None:
+            return 0.0  # Непроверенные эндпоинты опрашиваются первыми, чтобы набрать статистику
+        return self.latency_ewma / max(self.success_rate or 0.0, MIN_SUCCESS_RATE)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.state.value,
+            "requests": self.requests,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate, 3) if self.success_rate is not None else None,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "cooldown_s": self.cooldown if self.state != CircuitState.CLOSED else None,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointHealthRegistry:
+    """
+    Адаптивный выбор эндпоинтов ФИАС. Здоровые эндпоинты упорядочиваются по оценке
+    (самый быстрый и надежный первым); после FAILURE_THRESHOLD ошибок подряд эндпоинт
+    исключается на паузу, по ее истечении пропускается один пробный запрос (half-open).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._endpoints: Dict[str, EndpointHealth] = {}
+
+    def get(self, url: str) -> EndpointHealth:
+        health = self._endpoints.get(url)
+        if health is None:
+            health = self._endpoints[url] = EndpointHealth(url)
+        return health
+
+    def _available(self, health: EndpointHealth) -> bool:
+        if health.state == CircuitState.CLOSED:
+            return True
+        if health.state == CircuitState.OPEN and self.clock() - health.opened_at >= health.cooldown:
+            health.state = CircuitState.HALF_OPEN
+        return health.state == CircuitState.HALF_OPEN and not health.probe_in_flight
+
+    def ordered(self, urls: Iterable[str], reserve_probes: bool = True) -> List[str]:
+        """
+        Порядок опроса для очередного запроса. Пробный запрос к эндпоинту в состоянии half-open
+        идет первым, иначе при исправных соседях он никогда не получил бы трафика.
+        Исключенные эндпоинты пропускаются. reserve_probes=False — только просмотр порядка.
+        """
+        probes, healthy = [], []
+        for url in urls:
+            health = self.get(url)
+            if not self._available(health):
+                continue
+            if health.state == CircuitState.HALF_OPEN:
+                if reserve_probes:
+                    health.probe_in_flight = True
+                probes.append(health)
+            else:
+                healthy.append(health)
+        healthy.sort(key=EndpointHealth.score)  # sort стабилен: при равенстве сохраняется исходный порядок
+        return [health.url for health in probes + healthy]
+
+    def record_success(self, url: str, latency: float) -> None:
+        health = self.get(url)
+        health._observe(True, latency)
+        health.consecutive_failures = 0
+        health.probe_in_flight = False
+        if health.state != CircuitState.CLOSED:
+            health.state = CircuitState.CLOSED
+            health.cooldown = OPEN_COOLDOWN_SECONDS
+            health.opened_at = None
+
+    def record_failure(self, url: str, latency: float, error: str) -> None:
+        health = self.get(url)
+        health._observe(False, latency)
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.last_error = error
+        if health.state == CircuitState.HALF_OPEN:
+            # Неудачная проба: снова исключаем, пауза растет
+            health.probe_in_flight = False
+            health.cooldown = min(health.cooldown * 2, MAX_COOLDOWN_SECONDS)
+            health.state = CircuitState.OPEN
+            health.opened_at = self.clock()
+        elif health.state == CircuitState.CLOSED and health.consecutive_failures >= FAILURE_THRESHOLD:
+            health.state = CircuitState.OPEN
+            health.opened_at = self.clock()
+
+    def release_probe(self, url: str) -> None:
+        """Проба не состоялась (запрос не дошел до эндпоинта): следующий запрос повторит ее."""
+        self.get(url).probe_in_flight = False
+
+    def snapshot(self, urls: Iterable[str]) -> List[Dict[str, Any]]:
+        return [self.get(url).snapshot() for url in urls]
@@ -1,19 +1,53 @@
 import os
+import sys
+import time
+import asyncio
+import argparse
+import weakref
 import httpx
 import mcp.server.fastmcp as fastmcp
+from collections import OrderedDict
 from typing import Dict, Optional, Any, List
 import json
 
-# Инициализация FastMCP сервера для Агента 6
-mcp_server = fastmcp.FastMCP("Agent6_FIAS")
+# Запуск как скрипта (python server.py): корень проекта должен быть в sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from moslicenzia.address import address_key, address_tokens, group_by_address_key
+from moslicenzia.agents.agent6_mcp.health import EndpointHealthRegistry
+
+# Инициализация FastMCP сервера для Агента 6; на уровне INFO каждый вызов инструмента пишется в stderr
+mcp_server = fastmcp.FastMCP("Agent6_FIAS", log_level=os.environ.get("MOSLICENZIA_MCP_LOG_LEVEL", "INFO"))
+
+# Адрес портала; для офлайн-тестов указывает на локальный заменитель (python -m moslicenzia fias-standin)
+FIAS_BASE_URL = os.environ.get("MOSLICENZIA_FIAS_URL", "https://fias.nalog.ru").rstrip("/")
 
 # Известные эндпоинты для последовательной проверки
-FIAS_ENDPOINTS = [
-    "https://fias.nalog.ru/Search/FullTextSearch",
-    "https://fias.nalog.ru/Search/Search",
-    "https://fias.nalog.ru/Search/SearchAddress_Read",
-    "https://fias.nalog.ru/Search/SearchByAddress"
+FIAS_ENDPOINT_PATHS = [
+    "/Search/FullTextSearch",
+    "/Search/Search",
+    "/Search/SearchAddress_Read",
+    "/Search/SearchByAddress"
 ]
+FIAS_ENDPOINTS = [FIAS_BASE_URL + path for path in FIAS_ENDPOINT_PATHS]
+
+# Состояние эндпоинтов: порядок опроса адаптируется к задержкам и ошибкам
+ENDPOINT_HEALTH = EndpointHealthRegistry()
+
+# Кэш результатов проверки по каноническому ключу адреса (LRU)
+ADDRESS_CACHE_SIZE = 4096
+_ADDRESS_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Ограничение одновременных обращений к порталу: общий сервис обслуживает много клиентов,
+# но не должен открывать к ФИАС неограниченное число соединений
+MAX_CONCURRENT_LOOKUPS = int(os.environ.get("MOSLICENZIA_FIAS_CONCURRENCY", "16"))
+
+# Семафор и пул HTTP-соединений создаются на каждый цикл событий (в сервисе он один на процесс)
+_LOOP_RESOURCES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+# Запросы к ФИАС в процессе выполнения: одинаковые адреса ждут один общий запрос (single-flight)
+_IN_FLIGHT: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+_LOOKUP_STATS = {"cache_hits": 0, "coalesced": 0, "portal_lookups": 0}
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -22,61 +56,152 @@ HEADERS = {
     "Accept": "application/json, text/javascript, */*; q=0.01"
 }
 
+def _loop_resources() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    resources = _LOOP_RESOURCES.get(loop)
+    if resources is None:
+        resources = _LOOP_RESOURCES[loop] = {
+            "semaphore": asyncio.Semaphore(MAX_CONCURRENT_LOOKUPS),
+            # Создание клиента (SSL-контекст) стоит ~150 мс CPU, поэтому клиент переиспользуется
+            "client": httpx.AsyncClient(
+                timeout=10.0, follow_redirects=True,
+                limits=httpx.Limits(max_connections=MAX_CONCURRENT_LOOKUPS * 2),
+            ),
+        }
+    return resources
+
 async def search_fias_portal(address_query: str) -> Dict[str, Any]:
     """
     Прямой запрос к порталу fias.nalog.ru для получения подсказок по адресу.
-    Пробует несколько эндпоинтов и переходит к парсингу HTML при необходимости.
+    Эндпоинты опрашиваются в адаптивном порядке (ENDPOINT_HEALTH); исключенные
+    после серии ошибок эндпоинты пропускаются до пробного запроса.
     """
+    endpoints = ENDPOINT_HEALTH.ordered(FIAS_ENDPOINTS)
+    if not endpoints:
+        return {"status": "ERROR", "comment": "All FIAS API endpoints are temporarily disabled (circuit open)."}
+
+    # Эндпоинты, для которых исход запроса учтен (record_success/record_failure);
+    # пробы остальных снимаются в finally, в том числе при отмене вызывающего
+    resolved = set()
+    answered = False
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            for url in FIAS_ENDPOINTS:
-                try:
-                    params = {"term": address_query}
-                    response = await client.get(url, params=params, headers=HEADERS)
-                    
-                    if response.status_code == 200:
-                        results = response.json()
-                        if results and isinstance(results, list):
-                            best_match = results[0]
-                            return {
-                                "status": "VALID",
-                                "normalized_address": best_match.get("full_name"),
-                                "fias_id": best_match.get("object_id") or best_match.get("id"),
-                                "gar_id": best_match.get("object_id") or best_match.get("id"),
-                                "details": {"is_direct_scrape": True, "endpoint": url}
-                            }
-                except Exception:
-                    continue
-
-            # Fallback: Попытка поиска через основную страницу поиска и парсинг HTML-результатов
-            # Это медленно и сложнее, но очень надежно. 
-            # На данный момент, если все API-эндпоинты не срабатывают, мы полагаемся на логику моков/ошибок.
-            return {"status": "NOT_FOUND", "comment": "All FIAS API endpoints returned 404 or invalid data."}
-            
+        client = _loop_resources()["client"]
+        for url in endpoints:
+            started = time.perf_counter()
+            try:
+                params = {"term": address_query}
+                response = await client.get(url, params=params, headers=HEADERS)
+            except httpx.HTTPError as e:
+                ENDPOINT_HEALTH.record_failure(url, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+                resolved.add(url)
+                continue
+            latency = time.perf_counter() - started
+
+            if response.status_code != 200:
+                ENDPOINT_HEALTH.record_failure(url, latency, f"HTTP {response.status_code}")
+                resolved.add(url)
+                continue
+            try:
+                results = response.json()
+            except ValueError:
+                ENDPOINT_HEALTH.record_failure(url, latency, "Invalid JSON response")
+                resolved.add(url)
+                continue
+            # Пустой ответ — штатный результат: эндпоинт исправен, но адрес не нашел
+            ENDPOINT_HEALTH.record_success(url, latency)
+            resolved.add(url)
+            answered = True
+
+            if results and isinstance(results, list):
+                best_match = results[0]
+                return {
+                    "status": "VALID",
+                    "normalized_address": best_match.get("full_name"),
+                    "fias_id": best_match.get("object_id") or best_match.get("id"),
+                    "gar_id": best_match.get("object_id") or best_match.get("id"),
+                    "details": {"is_direct_scrape": True, "endpoint": url}
+                }
+
+        if answered:
+            return {"status": "NOT_FOUND", "comment": "FIAS API endpoints returned no matches."}
+        # Ни один эндпоинт не дал корректного ответа: это сбой портала, а не отсутствие адреса,
+        # поэтому результат не кэшируется (_lookup_address)
+        return {"status": "ERROR", "comment": "All FIAS API endpoints returned errors or invalid data."}
+        
     except Exception as e:
         return {"status": "ERROR", "comment": f"FIAS Scraping Error: {str(e)}"}
+    finally:
+        for url in endpoints:
+            if url not in resolved:
+                ENDPOINT_HEALTH.release_probe(url)
 
-@mcp_server.tool()
+@mcp_server.tool(structured_output=False)
 async def check_address_fias(address_query: str) -> Dict[str, Any]:
     """
     Поиск и валидация адреса в ФИАС/ГАР путем скрейпинга fias.nalog.ru.
     Возвращает нормализованный адрес, ID ФИАС/ГАР и статус валидации.
     """
-    # Прямой поиск на портале
-    result = await search_fias_portal(address_query)
+    # Разные записи одного адреса ("ул. Автозаводская, 18", "г Москва, ул Автозаводская, д 18") дают один ключ
+    key = address_key(address_query)
+    if key is None:
+        return dict(await _lookup_address(address_query, None))
+    if key in _ADDRESS_CACHE:
+        _ADDRESS_CACHE.move_to_end(key)
+        _LOOKUP_STATS["cache_hits"] += 1
+        return dict(_ADDRESS_CACHE[key])
+
+    pending = _IN_FLIGHT.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_lookup_address(address_query, key))
+        _IN_FLIGHT[key] = pending
+        pending.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    else:
+        _LOOKUP_STATS["coalesced"] += 1
+    # shield: отмена одного из ожидающих не отменяет общий запрос для остальных
+    return dict(await asyncio.shield(pending))
+
+async def _lookup_address(address_query: str, key: Optional[str]) -> Dict[str, Any]:
+    _LOOKUP_STATS["portal_lookups"] += 1
+    # Прямой поиск на портале (не более MAX_CONCURRENT_LOOKUPS одновременно)
+    async with _loop_resources()["semaphore"]:
+        result = await search_fias_portal(address_query)
     
     # Если прямой поиск не дал результатов или вернул ошибку, проверяем, не является ли это известным примером для демо
     if result.get("status") in ["NOT_FOUND", "ERROR"]:
         mock_result = simulate_fias_check(address_query)
         if mock_result.get("status") == "VALID":
-             return mock_result
-             
+            result = mock_result
+
+    # Сбои портала не кэшируются: следующий запрос должен повторить попытку
+    if key is not None and result.get("status") != "ERROR":
+        _ADDRESS_CACHE[key] = result
+        if len(_ADDRESS_CACHE) > ADDRESS_CACHE_SIZE:
+            _ADDRESS_CACHE.popitem(last=False)
     return result
 
+@mcp_server.tool(structured_output=False)
+async def check_addresses_fias(address_queries: List[str]) -> Dict[str, Any]:
+    """
+    Пакетная проверка адресов: дубликаты (по каноническому ключу) схлопываются
+    в один запрос к ФИАС. Результаты возвращаются в порядке входных адресов.
+    """
+    groups = group_by_address_key(address_queries)
+    unique = [indices[0] for indices in groups.values()]
+    checked = await asyncio.gather(*(check_address_fias(address_queries[i]) for i in unique))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(address_queries)
+    for indices, result in zip(groups.values(), checked):
+        for i in indices:
+            results[i] = result
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = {"status": "NOT_FOUND", "comment": "Пустой адрес."}
+    return {"results": results, "unique_queries": len(unique)}
+
 def simulate_fias_check(address: str) -> Dict:
     """Детерминированный мок для тестовых адресов."""
-    addr_lower = address.lower()
-    if "автозаводская" in addr_lower and "18" in addr_lower:
+    tokens = address_tokens(address)
+    if "автозаводская" in tokens and "д18" in tokens:
         return {
             "status": "VALID",
             "normalized_address": "г Москва, ул Автозаводская, д 18",
@@ -86,12 +211,49 @@ def simulate_fias_check(address: str) -> Dict:
         }
     return {"status": "VALID_MOCK", "normalized_address": address, "details": {"is_mock": True}}
 
-@mcp_server.tool()
+@mcp_server.tool(structured_output=False)
+async def get_fias_health() -> Dict[str, Any]:
+    """
+    Состояние эндпоинтов ФИАС (доля успехов, EWMA задержки, состояние circuit breaker),
+    текущий порядок опроса и статистика кэша и объединения запросов.
+    """
+    return {
+        "endpoints": ENDPOINT_HEALTH.snapshot(FIAS_ENDPOINTS),
+        "order": ENDPOINT_HEALTH.ordered(FIAS_ENDPOINTS, reserve_probes=False),
+        "cache_size": len(_ADDRESS_CACHE),
+        "in_flight": len(_IN_FLIGHT),
+        **_LOOKUP_STATS,
+    }
+
+@mcp_server.tool(structured_output=False)
 async def get_subdivision_kpp(fias_id: str) -> Optional[str]:
     """Получение КПП для конкретного подразделения на основе его ID местоположения в ФИАС."""
     # Упрощенная логика: в реальности это вызывает шлюз федеральной налоговой службы
     # На данный момент возвращаем значение мока, соответствующее нашим примерам
     return "772501001" if "74d633f7" in fias_id else "772501001"
 
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Запуск сервера. По умолчанию stdio (приватный сервер оркестратора); для общего
+    долгоживущего сервиса — streamable-http (http://host:port/mcp) или sse (http://host:port/sse).
+    """
+    global MAX_CONCURRENT_LOOKUPS
+    parser = argparse.ArgumentParser(description="Агент 6: MCP-сервер ФИАС")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default=os.environ.get("MOSLICENZIA_MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENT_LOOKUPS,
+                        help="Максимум одновременных обращений к порталу ФИАС")
+    parser.add_argument("--json-response", action="store_true",
+                        help="streamable-http: отвечать JSON вместо SSE-потока (дешевле на вызов)")
+    args = parser.parse_args(argv)
+
+    MAX_CONCURRENT_LOOKUPS = args.max_concurrency
+    mcp_server.settings.host = args.host
+    mcp_server.settings.port = args.port
+    mcp_server.settings.json_response = args.json_response
+    mcp_server.run(transport=args.transport)
+
 if __name__ == "__main__":
-    mcp_server.run()
+    main()
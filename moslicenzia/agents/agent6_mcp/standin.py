@@ -0,0 +1,203 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from moslicenzia.address import address_key
+
+# Заменитель портала fias.nalog.ru для офлайн-тестов и нагрузочных замеров Агента 6.
+# Отвечает на пути FIAS_ENDPOINT_PATHS записанными ответами из кассеты (JSON-файла);
+# задержки, ошибки 5xx и 404 внедряются по настройкам. В режиме записи запросы
+# проксируются на настоящий портал, а ответы сохраняются в кассету.
+#
+# Формат кассеты:
+#   {"interactions": [{"path": "/Search/FullTextSearch", "term": "...", "status": 200, "body": [...]}]}
+
+DEFAULT_UPSTREAM = "https://fias.nalog.ru"
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    # Очередь listen() по умолчанию (5) при нагрузочных тестах дает повторные SYN и секундные хвосты
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class Cassette:
+    """Записанные ответы портала, индексированные по пути и каноническому ключу адреса."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.interactions: List[Dict[str, Any]] = []
+        self._index: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._positions: Dict[Tuple[str, Optional[str]], int] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for interaction in json.load(f).get("interactions", []):
+                    self.add(interaction)
+
+    def add(self, interaction: Dict[str, Any]) -> None:
+        key = (interaction["path"], address_key(interaction.get("term")))
+        with self._lock:
+            # Последняя запись побеждает: повторная запись того же адреса заменяет ответ, а не дописывается
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = len(self.interactions)
+                self.interactions.append(interaction)
+            else:
+                self.interactions[position] = interaction
+            self._index[key] = interaction
+
+    def find(self, path: str, term: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self._index.get((path, address_key(term)))
+
+    def save(self, path: Optional[str] = None) -> None:
+        target = path or self.path
+        if not target:
+            return
+        with self._lock:
+            data = {"interactions": list(self.interactions)}
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class FiasStandIn:
+    """
+    Локальный HTTP-заменитель портала ФИАС.
+    Воспроизведение: ответ из кассеты, для неизвестного адреса — пустой список (200).
+    Запись (record=True): запрос проксируется на upstream, ответ добавляется в кассету.
+    """
+
+    def __init__(self, cassette: Cassette, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, not_found_rate: float = 0.0,
+                 dead_paths: Optional[List[str]] = None,
+                 record: bool = False, upstream: str = DEFAULT_UPSTREAM, seed: Optional[int] = None):
+        self.cassette = cassette
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.dead_paths = set(dead_paths or [])
+        self.record = record
+        self.upstream = upstream.rstrip("/")
+        self.stats = {"requests": 0, "replayed": 0, "misses": 0, "recorded": 0, "errors": 0, "not_found": 0,
+                      "upstream_errors": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        if record:
+            import httpx
+            from moslicenzia.agents.agent6_mcp.server import HEADERS
+
+            # Те же заголовки, что у Агента 6: записанные ответы совпадают с тем, что получает агент;
+            # соединения с порталом переиспользуются
+            self._client = httpx.Client(headers=HEADERS, timeout=10.0, follow_redirects=True)
+        self.httpd = _StandInHTTPServer((host, port), self._make_handler())
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self) -> Tuple[float, float]:
+        # random.Random не потокобезопасен для воспроизводимой последовательности
+        with self._lock:
+            return self._random.random(), self._random.uniform(-self.jitter_ms, self.jitter_ms)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def respond(self, path: str, term: Optional[str]) -> Tuple[int, Any]:
+        """Ответ на запрос (статус, JSON-тело) с учетом внедряемых задержек и ошибок."""
+        self._count("requests")
+        roll, jitter = self._draw()
+        delay = max(0.0, self.latency_ms + jitter) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if path in self.dead_paths or roll < self.not_found_rate:
+            self._count("not_found")
+            return 404, {"error": "Not Found"}
+        if roll < self.not_found_rate + self.error_rate:
+            self._count("errors")
+            return 500, {"error": "Injected failure"}
+
+        if self.record:
+            return self._record(path, term)
+
+        interaction = self.cassette.find(path, term)
+        if interaction is None:
+            self._count("misses")
+            return 200, []
+        self._count("replayed")
+        return interaction.get("status", 200), interaction.get("body")
+
+    def _record(self, path: str, term: Optional[str]) -> Tuple[int, Any]:
+        """Проксирует запрос на upstream; сбой соединения или таймаут — 502 без записи в кассету."""
+        import httpx
+
+        try:
+            response = self._client.get(self.upstream + path, params={"term": term or ""})
+        except httpx.HTTPError as e:
+            self._count("upstream_errors")
+            return 502, {"error": f"Upstream failure: {type(e).__name__}: {e}"}
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        self.cassette.add({"path": path, "term": term, "status": response.status_code, "body": body})
+        self._count("recorded")
+        return response.status_code, body
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело пишутся отдельно: без TCP_NODELAY алгоритм Нейгла и отложенный ACK
+            # добавляют ~40 мс к каждому ответу keep-alive соединения
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                term = parse_qs(parts.query).get("term", [None])[0]
+                status, body = standin.respond(parts.path, term)
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> "FiasStandIn":
+        """Запуск в фоновом потоке (для использования внутри процесса бенчмарка)."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._client is not None:
+            self._client.close()
+        if self.record:
+            self.cassette.save()
+
+    def __enter__(self) -> "FiasStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
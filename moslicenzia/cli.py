@@ -0,0 +1,421 @@
+"""
+Консольный интерфейс подсистемы экспертизы.
+
+    python -m moslicenzia classify FILE [FILE ...]
+    python -m moslicenzia parse FILE [FILE ...]
+    python -m moslicenzia expertise FILE [FILE ...] [--app-id ID]
+    python -m moslicenzia batch DIR [--order submission|cost] [--jobs N]
+    python -m moslicenzia registry-load [FILE ...] [--db URL] [--reindex]
+    python -m moslicenzia results-query [--inn INN] [--status FAILURE] [--since YYYY-MM-DD]
+    python -m moslicenzia fias-standin [--cassette FILE] [--port N] [--record]
+    python -m moslicenzia fias-server [--transport streamable-http] [--port N]
+    python -m moslicenzia serve [--workers N] [--port N]
+    python -m moslicenzia golden record|check [--package NAME] [--perf [--max-slowdown 1.5]]
+
+Результаты выводятся в stdout в формате JSONL (одна строка на документ или заявление)
+и сбрасываются сразу после обработки, что удобно для пакетных и скриптовых запусков.
+Тяжелые зависимости (langgraph, mcp, jinja2, httpx) импортируются только командами
+expertise и batch.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from moslicenzia.agents.agent1_reception.archive import is_archive, iter_archive_members
+
+# Кассета с записанными ответами портала ФИАС для офлайн-режима
+DEFAULT_FIAS_CASSETTE = os.path.join(os.path.dirname(__file__), "data", "fias", "cassette.json")
+
+# Пакетный режим сохраняет результаты в хранилище порциями такого размера
+RESULTS_FLUSH_SIZE = 200
+
+
+def _emit(record: Dict[str, Any]) -> None:
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def _iter_documents(paths: List[str]) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """Перебирает документы, разворачивая ZIP-архивы в их XML-члены."""
+    for path in paths:
+        if is_archive(path):
+            yield from iter_archive_members(path)
+        else:
+            yield path, None
+
+
+def serialize_expertise(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "application_id": result["application_id"],
+        "overall_status": result["overall_status"].value,
+        "recommendation": result["recommendation"],
+        "findings": result["analysis_findings"],
+        "decision_draft": result["decision_draft"],
+    }
+
+
+def _open_results_store(url: Optional[str]):
+    """Хранилище результатов, если задан URL (параметр или MOSLICENZIA_RESULTS_DB)."""
+    url = url or os.environ.get("MOSLICENZIA_RESULTS_DB")
+    if not url:
+        return None
+    from moslicenzia.storage.results import ExpertiseResultStore
+
+    return ExpertiseResultStore(url)
+
+
+def _discover_applications(root_dir: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Разбивает дерево каталогов на заявления:
+    XML-файлы одного каталога образуют одно заявление, каждый ZIP-архив — отдельное заявление.
+    """
+    for dir_path, dir_names, file_names in os.walk(root_dir):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, root_dir)
+        xml_files = []
+        for name in sorted(file_names):
+            path = os.path.join(dir_path, name)
+            if name.lower().endswith(".xml"):
+                xml_files.append(path)
+            elif is_archive(path):
+                yield os.path.normpath(os.path.join(rel_dir, name)), [path]
+        if xml_files:
+            yield rel_dir if rel_dir != "." else os.path.basename(os.path.abspath(root_dir)), xml_files
+
+
+def cmd_classify(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent1_reception.agent import ReceptionAgent
+
+    reception = ReceptionAgent()
+    for path, content in _iter_documents(args.paths):
+        res = reception.classify_document(path, content=content)
+        _emit({
+            "path": path,
+            "status": res.status.value,
+            "doc_type": res.data.get("doc_type"),
+            "comment": res.comment,
+        })
+    return 0
+
+
+def cmd_parse(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent1_reception.agent import ReceptionAgent
+    from moslicenzia.agents.agent2_parser.agent import ParserAgent
+    from moslicenzia.schemas.models import ValidationStatus
+
+    reception = ReceptionAgent()
+    parser = ParserAgent(xsd_mode=args.xsd)
+    for path, content in _iter_documents(args.paths):
+        class_res = reception.classify_document(path, content=content)
+        if class_res.status != ValidationStatus.SUCCESS:
+            _emit({"path": path, "status": class_res.status.value, "comment": class_res.comment})
+            continue
+        doc_type = class_res.data["doc_type"]
+        parse_res = parser.parse(doc_type, path, content=content)
+        record = parse_res.data.get("record")
+        _emit({
+            "path": path,
+            "status": parse_res.status.value,
+            "doc_type": doc_type,
+            "data": record.to_dict() if record is not None else None,
+            "xsd_errors": parse_res.data.get("xsd_errors"),
+            "xml_errors": parse_res.data.get("xml_errors"),
+            "comment": parse_res.comment,
+        })
+    return 0
+
+
+def cmd_expertise(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent4_analytical.agent import AnalyticalOrchestrator
+
+    orchestrator = AnalyticalOrchestrator(xsd_mode=args.xsd, registry_url=args.registry, mcp_url=args.mcp_url)
+    documents = [{"path": path} for path in args.paths]
+    result = orchestrator.run_expertise(documents, app_id=args.app_id)
+    store = _open_results_store(args.results)
+    if store is not None:
+        store.save(result)
+    _emit(serialize_expertise(result))
+    return 0
+
+
+def cmd_batch(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent4_analytical.agent import AnalyticalOrchestrator
+    from moslicenzia.scheduling import run_scheduled
+    from moslicenzia.storage.results import result_row
+
+    # Оркестратор (и скомпилированный граф) переиспользуется для всех заявлений пакета
+    orchestrator = AnalyticalOrchestrator(xsd_mode=args.xsd, registry_url=args.registry, mcp_url=args.mcp_url)
+    store = _open_results_store(args.results)
+    pending = []
+    exit_code = 0
+
+    def run(app_id: str, paths: List[str]):
+        return orchestrator.run_expertise([{"path": p} for p in paths], app_id=app_id)
+
+    try:
+        # По умолчанию заявления выполняются по одному в порядке обхода каталогов; с --order cost
+        # или --jobs > 1 вывод и сохранение идут в главном потоке в порядке завершения
+        for app_id, result, error, _ in run_scheduled(run, _discover_applications(args.root),
+                                                     jobs=args.jobs, order=args.order):
+            if error is not None:
+                exit_code = 1
+                _emit({"application_id": app_id, "overall_status": "ERROR", "comment": str(error)})
+                continue
+            _emit(serialize_expertise(result))
+            if store is not None:
+                # В буфере хранятся готовые строки, а не состояния графа с извлеченными записями
+                pending.append(result_row(result))
+                if len(pending) >= RESULTS_FLUSH_SIZE:
+                    store.save_rows(pending)
+                    pending = []
+    finally:
+        if pending:
+            store.save_rows(pending)
+    return exit_code
+
+
+def cmd_registry_load(args: argparse.Namespace) -> int:
+    from moslicenzia.storage.registry import DEFAULT_REGISTRY_URL, RevokedLicenseRegistry
+
+    registry = RevokedLicenseRegistry(args.db or DEFAULT_REGISTRY_URL)
+    for path in args.paths:
+        _emit({"path": path, "loaded": registry.load_file(path)})
+    if args.reindex:
+        _emit({"reindexed": registry.reindex_addresses()})
+    _emit({"total": registry.count()})
+    return 0
+
+
+def cmd_results_query(args: argparse.Namespace) -> int:
+    from datetime import date
+    from moslicenzia.storage.results import DEFAULT_RESULTS_URL, ExpertiseResultStore
+
+    store = ExpertiseResultStore(args.db or DEFAULT_RESULTS_URL)
+    rows = store.query(
+        application_id=args.app_id, inn=args.inn, status=args.status,
+        since=date.fromisoformat(args.since) if args.since else None,
+        until=date.fromisoformat(args.until) if args.until else None,
+        limit=args.limit, full=args.full,
+    )
+    for row in rows:
+        _emit(row)
+    return 0
+
+
+def cmd_fias_standin(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+
+    standin = FiasStandIn(
+        Cassette(args.cassette), host=args.host, port=args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, not_found_rate=args.not_found_rate,
+        dead_paths=args.dead_path, record=args.record, upstream=args.upstream, seed=args.seed,
+    )
+    _emit({"url": standin.url, "record": args.record, "interactions": len(standin.cassette.interactions)})
+    try:
+        standin.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        _emit({"stats": standin.stats})
+    return 0
+
+
+def cmd_fias_server(args: argparse.Namespace) -> int:
+    from moslicenzia.agents.agent6_mcp.server import main as serve
+
+    argv = ["--transport", args.transport, "--host", args.host, "--port", str(args.port)]
+    # Без флага действует MOSLICENZIA_FIAS_CONCURRENCY (по умолчанию 16)
+    if args.max_concurrency is not None:
+        argv += ["--max-concurrency", str(args.max_concurrency)]
+    if args.json_response:
+        argv.append("--json-response")
+    serve(argv)
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    from moslicenzia.scheduling import AGING_RATE
+    from moslicenzia.service import ExpertiseService, WorkerPool
+
+    pool = WorkerPool(
+        args.workers, aging=AGING_RATE if args.aging is None else args.aging, xsd=args.xsd, registry_url=args.registry, mcp_url=args.mcp_url,
+        results_url=args.results or os.environ.get("MOSLICENZIA_RESULTS_DB"), warm_mcp=not args.no_warm_mcp,
+    ).start()
+    service = ExpertiseService(pool, host=args.host, port=args.port)
+    _emit({"url": service.url, "workers": [w.info for w in pool.workers]})
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        _emit({"stats": pool.stats})
+    return 0
+
+
+def cmd_golden(args: argparse.Namespace) -> int:
+    from moslicenzia.golden import run_corpus
+
+    exit_code = 0
+    reports = run_corpus(
+        args.action, corpus=args.corpus, golden_dir=args.golden_dir, packages=args.package, repeat=args.repeat,
+        max_slowdown=args.max_slowdown if args.perf else None,
+        max_memory_growth=args.max_memory_growth if args.perf else None,
+    )
+    for report in reports:
+        if report["status"] not in ("OK", "RECORDED"):
+            exit_code = 1
+        _emit(report)
+    return exit_code
+
+
+def _add_mcp_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--mcp-url", default=None,
+        help="Общий сервис Агента 6 (напр. http://127.0.0.1:8766/mcp); по умолчанию MOSLICENZIA_MCP_URL или приватный stdio-сервер"
+    )
+
+
+def _add_registry_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--registry", default=None, help="URL реестра отозванных лицензий (напр. sqlite:///registry.db)")
+
+
+def _add_results_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--results", default=None,
+                        help="URL хранилища результатов (напр. sqlite:///results.db); по умолчанию MOSLICENZIA_RESULTS_DB")
+
+
+def _add_aging_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--aging", type=float, default=None,
+                        help="Старение очереди воркеров: мс оценки стоимости, списываемые за каждую мс ожидания запроса "
+                             "(по умолчанию 1.0)")
+
+
+def _add_xsd_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--xsd", choices=["off", "always", "on_failure"], default="off",
+        help="XSD-валидация: off, always (каждый документ) или on_failure (только при ошибке разбора). "
+             "Схемы в поставку не входят: без файлов <DocType>.xsd в MOSLICENZIA_XSD_DIR "
+             "(по умолчанию moslicenzia/schemas/xsd) проверка не выполняется ни в одном режиме"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="moslicenzia", description="Предварительная экспертиза пакетов документов")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_classify = subparsers.add_parser("classify", help="Классификация документов (Агент 1)")
+    p_classify.add_argument("paths", nargs="+", help="XML-файлы или ZIP-архивы")
+    p_classify.set_defaults(func=cmd_classify)
+
+    p_parse = subparsers.add_parser("parse", help="Классификация и извлечение данных (Агенты 1-2)")
+    p_parse.add_argument("paths", nargs="+", help="XML-файлы или ZIP-архивы")
+    _add_xsd_argument(p_parse)
+    p_parse.set_defaults(func=cmd_parse)
+
+    p_expertise = subparsers.add_parser("expertise", help="Полная экспертиза одного заявления")
+    p_expertise.add_argument("paths", nargs="+", help="Документы заявления (XML-файлы или ZIP-архивы)")
+    p_expertise.add_argument("--app-id", default="REQ-001", help="Идентификатор заявления")
+    _add_xsd_argument(p_expertise)
+    _add_registry_argument(p_expertise)
+    _add_mcp_argument(p_expertise)
+    _add_results_argument(p_expertise)
+    p_expertise.set_defaults(func=cmd_expertise)
+
+    p_batch = subparsers.add_parser("batch", help="Экспертиза всех заявлений в дереве каталогов")
+    p_batch.add_argument("root", help="Корневой каталог (каталог с XML или ZIP-архив = одно заявление)")
+    _add_xsd_argument(p_batch)
+    _add_registry_argument(p_batch)
+    _add_mcp_argument(p_batch)
+    _add_results_argument(p_batch)
+    p_batch.add_argument("--order", choices=["submission", "cost"], default="submission",
+                         help="Порядок заявлений: по порядку обхода или по оценке стоимости (сначала короткие); "
+                              "с cost строки выводятся в порядке завершения")
+    p_batch.add_argument("--jobs", type=int, default=1,
+                         help="Число заявлений в работе одновременно (разбор одного перекрывает проверку ФИАС другого); "
+                              "при N > 1 строки выводятся в порядке завершения")
+    p_batch.set_defaults(func=cmd_batch)
+
+    p_registry = subparsers.add_parser("registry-load", help="Загрузка выгрузок реестра отозванных лицензий (CSV/XML)")
+    p_registry.add_argument("paths", nargs="*", help="CSV- или XML-файлы выгрузки")
+    p_registry.add_argument("--reindex", action="store_true",
+                            help="Пересчитать ключи адресов уже загруженных записей")
+    p_registry.add_argument("--db", default=None, help="URL базы реестра (по умолчанию MOSLICENZIA_REGISTRY_DB или sqlite:///registry.db)")
+    p_registry.set_defaults(func=cmd_registry_load)
+
+    p_results = subparsers.add_parser("results-query", help="Поиск сохраненных результатов экспертизы")
+    p_results.add_argument("--app-id", default=None, help="Идентификатор заявления")
+    p_results.add_argument("--inn", default=None, help="ИНН заявителя")
+    p_results.add_argument("--status", action="append", default=None, choices=["SUCCESS", "WARNING", "FAILURE"],
+                           help="Итоговый статус (FAILURE — отказ); можно повторять")
+    p_results.add_argument("--since", default=None, help="С даты включительно (YYYY-MM-DD)")
+    p_results.add_argument("--until", default=None, help="По дату, не включая (YYYY-MM-DD)")
+    p_results.add_argument("--limit", type=int, default=None)
+    p_results.add_argument("--full", action="store_true", help="Включить отчет и извлеченные данные")
+    p_results.add_argument("--db", default=None, help="URL хранилища (по умолчанию MOSLICENZIA_RESULTS_DB или sqlite:///results.db)")
+    p_results.set_defaults(func=cmd_results_query)
+
+    p_standin = subparsers.add_parser("fias-standin", help="Локальный заменитель портала ФИАС (воспроизведение/запись кассет)")
+    p_standin.add_argument("--cassette", default=DEFAULT_FIAS_CASSETTE, help="JSON-файл кассеты")
+    p_standin.add_argument("--host", default="127.0.0.1")
+    p_standin.add_argument("--port", type=int, default=8765)
+    p_standin.add_argument("--latency-ms", type=float, default=0.0, help="Средняя задержка ответа")
+    p_standin.add_argument("--jitter-ms", type=float, default=0.0, help="Разброс задержки (равномерный, ±)")
+    p_standin.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 500")
+    p_standin.add_argument("--not-found-rate", type=float, default=0.0, help="Доля ответов 404")
+    p_standin.add_argument("--dead-path", action="append", default=[],
+                           help="Путь, всегда отвечающий 404 (напр. /Search/Search); можно повторять")
+    p_standin.add_argument("--record", action="store_true", help="Проксировать на портал и записывать ответы в кассету")
+    p_standin.add_argument("--upstream", default="https://fias.nalog.ru", help="Портал для режима записи")
+    p_standin.add_argument("--seed", type=int, default=None, help="Seed генератора внедряемых ошибок")
+    p_standin.set_defaults(func=cmd_fias_standin)
+
+    p_server = subparsers.add_parser("fias-server", help="Общий сервис Агента 6 (MCP) для нескольких оркестраторов")
+    p_server.add_argument("--transport", choices=["streamable-http", "sse", "stdio"], default="streamable-http")
+    p_server.add_argument("--host", default="127.0.0.1")
+    p_server.add_argument("--port", type=int, default=8766)
+    p_server.add_argument("--max-concurrency", type=int, default=None,
+                          help="Максимум одновременных обращений к порталу ФИАС; по умолчанию MOSLICENZIA_FIAS_CONCURRENCY или 16")
+    p_server.add_argument("--json-response", action="store_true", help="Ответы JSON вместо SSE-потока (дешевле на вызов)")
+    p_server.set_defaults(func=cmd_fias_server)
+
+    p_serve = subparsers.add_parser("serve", help="HTTP-сервис экспертизы с пулом прогретых воркеров (POST /expertise)")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8780)
+    p_serve.add_argument("--workers", type=int, default=2, help="Число процессов-воркеров")
+    p_serve.add_argument("--no-warm-mcp", action="store_true",
+                         help="Не держать MCP-сессию открытой (открывать на каждое заявление)")
+    _add_xsd_argument(p_serve)
+    _add_registry_argument(p_serve)
+    _add_mcp_argument(p_serve)
+    _add_results_argument(p_serve)
+    _add_aging_argument(p_serve)
+    p_serve.set_defaults(func=cmd_serve)
+
+    p_golden = subparsers.add_parser("golden", help="Дифференциальная проверка на эталонном корпусе пакетов")
+    p_golden.add_argument("action", choices=["record", "check"], help="record — записать эталоны, check — сравнить с ними")
+    p_golden.add_argument("--package", action="append", default=None, help="Только указанные пакеты; можно повторять")
+    p_golden.add_argument("--corpus", default=None, help="Файл корпуса (по умолчанию moslicenzia/data/golden/corpus.json)")
+    p_golden.add_argument("--golden-dir", default=None, help="Каталог эталонов (по умолчанию moslicenzia/data/golden/expected)")
+    p_golden.add_argument("--repeat", type=int, default=5, help="Прогонов на замер (берется минимум)")
+    p_golden.add_argument("--perf", action="store_true",
+                          help="Сравнивать также время и память (эталон должен быть записан на этой же машине)")
+    p_golden.add_argument("--max-slowdown", type=float, default=1.5, help="Допустимое отношение времени новое/эталон (с --perf)")
+    p_golden.add_argument("--max-memory-growth", type=float, default=None,
+                          help="Допустимое отношение пиковой памяти разбора документа новое/эталон (с --perf)")
+    p_golden.set_defaults(func=cmd_golden)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
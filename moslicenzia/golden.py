@@ -0,0 +1,281 @@
+"""
+Дифференциальная проверка на эталонном корпусе пакетов (golden-файлы).
+
+    python -m moslicenzia golden record [--package NAME ...]
+    python -m moslicenzia golden check [--perf [--max-slowdown 1.5]]
+
+Корпус (moslicenzia/data/golden/corpus.json) описывает реальные пакеты (каталоги и файлы)
+и синтетические — производные от базового пакета с заменами в тексте документов
+и исключенными документами. Для каждого пакета в эталон записываются извлеченные данные,
+замечания, итоговый статус и рекомендация, а также время и пиковая память разбора каждого
+документа и время полной экспертизы. Режим check сравнивает новую сборку с эталоном и
+завершается с ошибкой при расхождении результатов, а с --perf — и при замедлении сверх порога.
+Замеры эталона зависят от машины, на которой он записан, поэтому по умолчанию не сравниваются:
+для проверки скорости эталон перезаписывается локально (record) до изменения и сверяется после.
+
+Агент 6 обращается к локальному заменителю портала ФИАС с записанной кассетой,
+поэтому результаты не зависят от сети.
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+GOLDEN_ROOT = os.path.join(os.path.dirname(__file__), "data", "golden")
+DEFAULT_CORPUS = os.path.join(GOLDEN_ROOT, "corpus.json")
+DEFAULT_GOLDEN_DIR = os.path.join(GOLDEN_ROOT, "expected")
+
+# Замедление меньше этого значения (мс) не считается регрессией: шум измерения коротких операций
+# (планировщик ОС, сборка мусора, ответ заменителя ФИАС) на пакетах корпуса доходит до единиц мс
+MIN_SLOWDOWN_DELTA_MS = 5.0
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> List[Dict[str, Any]]:
+    """Пакеты корпуса; пути документов указываются относительно файла корпуса."""
+    with open(path, encoding="utf-8") as f:
+        packages = json.load(f)["packages"]
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for package in packages:
+        package["documents"] = [os.path.normpath(os.path.join(base_dir, p)) for p in package.get("documents", [])]
+    return packages
+
+
+def _expand(paths: List[str]) -> List[str]:
+    """Каталоги разворачиваются в отсортированные XML-файлы и ZIP-архивы."""
+    from moslicenzia.agents.agent1_reception.archive import is_archive
+
+    documents = []
+    for path in paths:
+        if not os.path.isdir(path):
+            documents.append(path)
+            continue
+        for name in sorted(os.listdir(path)):
+            member = os.path.join(path, name)
+            if name.lower().endswith(".xml") or is_archive(member):
+                documents.append(member)
+    return documents
+
+
+def materialize(package: Dict[str, Any], by_name: Dict[str, Dict[str, Any]], work_dir: str) -> List[str]:
+    """
+    Пути документов пакета. Для синтетического пакета документы базового пакета
+    копируются в work_dir с заменами из replace, документы из exclude пропускаются.
+    """
+    if "base" not in package:
+        return _expand(package["documents"])
+
+    base_documents = materialize(by_name[package["base"]], by_name, work_dir)
+    exclude = set(package.get("exclude", []))
+    replace = package.get("replace", {})
+    unknown = (exclude | set(replace)) - {os.path.basename(p) for p in base_documents}
+    if unknown:
+        raise ValueError(f"Пакет {package['name']}: нет документов {sorted(unknown)} в базовом пакете")
+
+    target_dir = os.path.join(work_dir, package["name"])
+    os.makedirs(target_dir, exist_ok=True)
+    documents = []
+    for path in base_documents:
+        name = os.path.basename(path)
+        if name in exclude:
+            continue
+        if name not in replace:
+            documents.append(path)
+            continue
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        for old, new in replace[name]:
+            if old not in text:
+                raise ValueError(f"Пакет {package['name']}: в {name} не найден фрагмент {old!r}")
+            text = text.replace(old, new)
+        target = os.path.join(target_dir, name)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(text)
+        documents.append(target)
+    return documents
+
+
+def _diff(path: str, expected: Any, actual: Any, out: List[str]) -> None:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in actual:
+                out.append(f"{path}.{key}: отсутствует (ожидалось {expected[key]!r})")
+            elif key not in expected:
+                out.append(f"{path}.{key}: лишнее значение {actual[key]!r}")
+            else:
+                _diff(f"{path}.{key}", expected[key], actual[key], out)
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            _diff(f"{path}[{i}]", e, a, out)
+    elif expected != actual:
+        out.append(f"{path}: {expected!r} != {actual!r}")
+
+
+def compare(expected: Dict[str, Any], actual: Dict[str, Any], max_slowdown: Optional[float] = None,
+            max_memory_growth: Optional[float] = None) -> Dict[str, List[str]]:
+    """
+    Расхождения результатов и регрессии производительности относительно эталона.
+    max_slowdown/max_memory_growth — допустимое отношение новое/эталон (None — не проверять).
+    """
+    diffs: List[str] = []
+    for key in ("overall_status", "recommendation", "extracted_data"):
+        _diff(key, expected.get(key), actual.get(key), diffs)
+
+    expected_findings, actual_findings = expected.get("findings", []), actual.get("findings", [])
+    diffs += [f"findings: пропало «{f}»" for f in expected_findings if f not in actual_findings]
+    diffs += [f"findings: новое «{f}»" for f in actual_findings if f not in expected_findings]
+    if not diffs and expected_findings != actual_findings:
+        diffs.append("findings: изменился порядок замечаний")
+
+    regressions: List[str] = []
+    baseline, current = expected.get("performance", {}), actual.get("performance", {})
+    timings = [("expertise", baseline.get("expertise_ms"), current.get("expertise_ms"))]
+    for name, doc in current.get("documents", {}).items():
+        timings.append((name, baseline.get("documents", {}).get(name, {}).get("ms"), doc["ms"]))
+    for name, old, new in timings:
+        if max_slowdown and old and new > old * max_slowdown and new - old > MIN_SLOWDOWN_DELTA_MS:
+            regressions.append(f"{name}: {old:.1f} мс -> {new:.1f} мс (x{new / old:.2f})")
+    if max_memory_growth:
+        for name, doc in current.get("documents", {}).items():
+            old = baseline.get("documents", {}).get(name, {}).get("peak_kb")
+            if old and doc["peak_kb"] > old * max_memory_growth:
+                regressions.append(f"{name}: пиковая память {old:.0f} КБ -> {doc['peak_kb']:.0f} КБ")
+    return {"diffs": diffs, "regressions": regressions}
+
+
+class GoldenRunner:
+    """
+    Прогон пакетов корпуса: отдельный замер разбора каждого документа (Агенты 1-2)
+    и полная экспертиза пакета. Время — минимум из repeat прогонов.
+    """
+
+    def __init__(self, repeat: int = 5):
+        from moslicenzia.agents.agent1_reception.agent import ReceptionAgent
+        from moslicenzia.agents.agent2_parser.agent import ParserAgent
+        from moslicenzia.agents.agent4_analytical.agent import AnalyticalOrchestrator
+        from moslicenzia.agents.agent6_mcp.client import PersistentSession
+        from moslicenzia.agents.agent6_mcp.standin import Cassette, FiasStandIn
+        from moslicenzia.cli import DEFAULT_FIAS_CASSETTE
+
+        self.repeat = max(1, repeat)
+        self.reception = ReceptionAgent()
+        self.parser = ParserAgent()
+        self.standin = FiasStandIn(Cassette(DEFAULT_FIAS_CASSETTE)).start()
+        env = {
+            **os.environ, "MOSLICENZIA_FIAS_URL": self.standin.url,
+            "NO_PROXY": "127.0.0.1,localhost", "MOSLICENZIA_MCP_LOG_LEVEL": "WARNING",
+        }
+        self.mcp_session = PersistentSession(env=env).start()
+        self.orchestrator = AnalyticalOrchestrator(mcp_session=self.mcp_session)
+
+    def _parse_document(self, path: str, content: Optional[bytes] = None) -> Optional[str]:
+        from moslicenzia.schemas.models import ValidationStatus
+
+        class_res = self.reception.classify_document(path, content=content)
+        if class_res.status != ValidationStatus.SUCCESS:
+            return None
+        doc_type = class_res.data["doc_type"]
+        self.parser.parse(doc_type, path, content=content)
+        return doc_type.value
+
+    def measure_document(self, path: str, content: Optional[bytes] = None) -> Dict[str, Any]:
+        timings = []
+        doc_type = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            doc_type = self._parse_document(path, content)
+            timings.append((time.perf_counter() - started) * 1000)
+        tracemalloc.start()
+        try:
+            self._parse_document(path, content)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {"doc_type": doc_type, "ms": round(min(timings), 3), "peak_kb": round(peak / 1024, 1)}
+
+    def run_package(self, name: str, documents: List[str]) -> Dict[str, Any]:
+        from moslicenzia.agents.agent1_reception.archive import is_archive, iter_archive_members
+
+        measured = {}
+        for path in documents:
+            if is_archive(path):
+                for member_path, content in iter_archive_members(path):
+                    measured[os.path.relpath(member_path, os.path.dirname(path))] = self.measure_document(member_path, content)
+            else:
+                measured[os.path.basename(path)] = self.measure_document(path)
+
+        timings = []
+        result = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = self.orchestrator.run_expertise([{"path": p} for p in documents], app_id=name)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            "package": name,
+            "overall_status": result["overall_status"].value,
+            "recommendation": result["recommendation"],
+            "findings": result["analysis_findings"],
+            "extracted_data": {
+                doc_type.value: [record.to_dict() for record in records]
+                for doc_type, records in sorted(result["extracted_data"].items(), key=lambda item: item[0].value)
+            },
+            "performance": {"expertise_ms": round(min(timings), 3), "documents": measured},
+        }
+
+    def close(self) -> None:
+        self.mcp_session.close()
+        self.standin.stop()
+
+
+def golden_path(golden_dir: str, name: str) -> str:
+    return os.path.join(golden_dir, f"{name}.json")
+
+
+def run_corpus(mode: str, corpus: Optional[str] = None, golden_dir: Optional[str] = None,
+               packages: Optional[List[str]] = None, repeat: int = 5,
+               max_slowdown: Optional[float] = None, max_memory_growth: Optional[float] = None):
+    """
+    Прогон корпуса в режиме record (запись эталонов) или check (сравнение с эталонами).
+    Возвращает по одному отчету на пакет (генератор, чтобы отчеты выводились по мере готовности).
+    """
+    golden_dir = golden_dir or DEFAULT_GOLDEN_DIR
+    corpus_packages = load_corpus(corpus or DEFAULT_CORPUS)
+    by_name = {p["name"]: p for p in corpus_packages}
+    unknown = set(packages or []) - set(by_name)
+    if unknown:
+        raise ValueError(f"В корпусе нет пакетов {sorted(unknown)}")
+
+    runner = GoldenRunner(repeat=repeat)
+    try:
+        with tempfile.TemporaryDirectory(prefix="moslicenzia-golden-") as work_dir:
+            for package in corpus_packages:
+                if packages and package["name"] not in packages:
+                    continue
+                actual = runner.run_package(package["name"], materialize(package, by_name, work_dir))
+                path = golden_path(golden_dir, package["name"])
+
+                if mode == "record":
+                    os.makedirs(golden_dir, exist_ok=True)
+                    with open(path, "w", encoding="utf-8") as f:
+                        json.dump(actual, f, ensure_ascii=False, indent=2, default=str)
+                        f.write("\n")
+                    yield {"package": package["name"], "status": "RECORDED", "overall_status": actual["overall_status"],
+                           "expertise_ms": actual["performance"]["expertise_ms"]}
+                    continue
+
+                if not os.path.exists(path):
+                    yield {"package": package["name"], "status": "MISSING", "comment": f"Нет эталона {path}"}
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    expected = json.load(f)
+                # Сравнение после JSON-сериализации: типы значений совпадают с эталоном
+                actual = json.loads(json.dumps(actual, ensure_ascii=False, default=str))
+                report = compare(expected, actual, max_slowdown, max_memory_growth)
+                status = "DIVERGED" if report["diffs"] else "SLOWER" if report["regressions"] else "OK"
+                yield {"package": package["name"], "status": status, **report,
+                       "expertise_ms": actual["performance"]["expertise_ms"],
+                       "baseline_ms": expected.get("performance", {}).get("expertise_ms")}
+    finally:
+        runner.close()
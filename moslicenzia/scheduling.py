@@ -0,0 +1,301 @@
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from moslicenzia.agents.agent1_reception.agent import doc_type_from_filename
+from moslicenzia.agents.agent1_reception.archive import is_archive
+from moslicenzia.schemas.models import DocType
+
+# Оценка стоимости экспертизы пакета для планирования пакетных запусков и сервиса.
+# Разбор (классификация + извлечение) линеен по размеру документа; проверка адресов в ФИАС —
+# сетевое ожидание на каждый объект заявления. Коэффициенты сняты по эталонному корпусу
+# (python -m moslicenzia golden record, поле performance).
+
+# Разбор, мс на КБ документа
+PARSE_MS_PER_KB: Dict[DocType, float] = {
+    DocType.ROSREESTR: 0.041,
+    DocType.EGRUL: 0.040,
+    DocType.APPLICATION: 0.037,
+    DocType.RNIP_DUTY: 0.036,
+    DocType.RNIP_FINES: 0.036,
+    DocType.FNS_TAX_DEBT: 0.040,
+}
+DEFAULT_PARSE_MS_PER_KB = 0.041
+
+# Постоянные затраты на документ (открытие, классификация) и на пакет (проверки, отчет)
+DOCUMENT_OVERHEAD_MS = 0.1
+PACKAGE_OVERHEAD_MS = 10.0
+
+# ZIP-архивы оцениваются по сжатому размеру с поправкой на степень сжатия XML
+ARCHIVE_EXPANSION = 5.0
+
+# Сетевое ожидание: одна проверка адреса в ФИАС на объект заявления
+FIAS_LOOKUP_MS = float(os.environ.get("MOSLICENZIA_FIAS_LOOKUP_MS", "150"))
+
+# Старение: каждая миллисекунда ожидания снижает приоритет пакета на AGING_RATE мс оценки,
+# поэтому крупный пакет ждет не дольше (своя стоимость / AGING_RATE) новых мелких пакетов
+AGING_RATE = 1.0
+
+# Заголовок файла, по которому уточняется тип документа без полного разбора
+_SNIFF_BYTES = 4096
+_SEPARATE_DIVISION = b"<separate_division>"
+
+T = TypeVar("T")
+
+
+@dataclass
+class PackageCost:
+    """Оценка стоимости пакета, мс: разбор (CPU) и проверка адресов (ожидание сети)."""
+    cpu_ms: float = 0.0
+    io_ms: float = 0.0
+    objects: int = 0
+    largest_kb: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.cpu_ms + self.io_ms
+
+    @property
+    def cpu_bound(self) -> bool:
+        return self.cpu_ms > self.io_ms
+
+
+def _sniff_doc_type(path: str) -> Optional[DocType]:
+    doc_type = doc_type_from_filename(path)
+    if doc_type is not None:
+        return doc_type
+    with open(path, "rb") as f:
+        head = f.read(_SNIFF_BYTES)
+    if b"<extract_" in head or b"ReestrExtract" in head:
+        return DocType.ROSREESTR
+    if "СвЮЛ".encode("utf-8") in head or "СвЮЛ".encode("cp1251") in head:
+        return DocType.EGRUL
+    if b"separate_division" in head or b"CoordinateMessage" in head:
+        return DocType.APPLICATION
+    return None
+
+
+def _count_objects(path: str) -> int:
+    """Число объектов (separate_division) в заявлении — потоковым поиском без разбора XML."""
+    count = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1 << 16)
+            if not chunk:
+                break
+            data = tail + chunk
+            count += data.count(_SEPARATE_DIVISION)
+            # Хвост перекрывает границу блоков, но не может содержать целое вхождение
+            tail = data[-(len(_SEPARATE_DIVISION) - 1):]
+    return count
+
+
+def estimate_cost(paths: Iterable[str]) -> PackageCost:
+    """
+    Оценка стоимости пакета по размерам документов, их типам и числу объектов заявления.
+    Читаются только заголовки документов (и заявление — потоково), XML не разбирается.
+    """
+    cost = PackageCost(cpu_ms=PACKAGE_OVERHEAD_MS)
+    for path in paths:
+        try:
+            size_kb = os.path.getsize(path) / 1024
+            if is_archive(path):
+                doc_type, size_kb = None, size_kb * ARCHIVE_EXPANSION
+            else:
+                doc_type = _sniff_doc_type(path)
+        except OSError:
+            # Отсутствующий файл отклоняется Агентом 1 без разбора
+            continue
+        cost.cpu_ms += DOCUMENT_OVERHEAD_MS + size_kb * PARSE_MS_PER_KB.get(doc_type, DEFAULT_PARSE_MS_PER_KB)
+        cost.largest_kb = max(cost.largest_kb, size_kb)
+        if doc_type == DocType.APPLICATION:
+            cost.objects += _count_objects(path)
+    # Заявление без объектов все равно проверяется в ФИАС (один пустой запрос)
+    cost.io_ms = max(cost.objects, 1) * FIAS_LOOKUP_MS
+    return cost
+
+
+def _now_ms() -> float:
+    return time.monotonic() * 1000
+
+
+class CostQueue(Generic[T]):
+    """
+    Очередь «сначала короткие» (SJF) со старением.
+    Приоритет элемента — стоимость минус AGING_RATE * время ожидания. Поправка на текущее
+    время одинакова для всех элементов, поэтому порядок определяется неизменным ключом
+    стоимость + AGING_RATE * момент постановки, и очередь остается обычной кучей.
+    При равных ключах соблюдается порядок постановки.
+    """
+
+    def __init__(self, aging: float = AGING_RATE):
+        self.aging = aging
+        self._heap: List[Tuple[float, int, T]] = []
+        self._seq = itertools.count()
+
+    def key(self, cost_ms: float) -> float:
+        return cost_ms + self.aging * _now_ms()
+
+    def push(self, item: T, cost_ms: float = 0.0) -> None:
+        heapq.heappush(self._heap, (self.key(cost_ms), next(self._seq), item))
+
+    def pop(self) -> T:
+        return heapq.heappop(self._heap)[2]
+
+    def peek_key(self) -> float:
+        return self._heap[0][0] if self._heap else float("inf")
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class CostScheduler(Generic[T]):
+    """
+    Раздача свободных ресурсов (воркеров сервиса) ожидающим запросам в порядке SJF со старением:
+    освободившийся ресурс получает запрос с наименьшим ключом, а не пришедший первым.
+    """
+
+    def __init__(self, aging: float = AGING_RATE):
+        self._queue: CostQueue[int] = CostQueue(aging)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._free: List[T] = []
+        self._waiting: List[Tuple[float, int]] = []
+
+    def put(self, resource: T) -> None:
+        with self._cond:
+            self._free.append(resource)
+            self._cond.notify_all()
+
+    def get(self, cost_ms: float = 0.0, timeout: Optional[float] = None) -> T:
+        """Ждет ресурс; по истечении timeout выбрасывает queue.Empty."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = (self._queue.key(cost_ms), next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            while not (self._free and self._waiting[0] == ticket):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    raise queue.Empty
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            resource = self._free.pop()
+            # Следующий в очереди мог дождаться, если свободных ресурсов несколько
+            self._cond.notify_all()
+            return resource
+
+    def get_nowait(self) -> T:
+        with self._cond:
+            if not self._free:
+                raise queue.Empty
+            return self._free.pop()
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+
+def run_scheduled(run: Callable[[str, List[str]], Any], applications: Iterable[Tuple[str, List[str]]],
+                  jobs: int = 1, order: str = "submission"
+                  ) -> Iterator[Tuple[str, Any, Optional[Exception], Dict[str, Any]]]:
+    """
+    Выполняет run(app_id, paths) для всех заявлений пакета в jobs потоках.
+    order="submission" — в порядке поступления, order="cost" — сначала короткие по оценке стоимости.
+    Все заявления пакета ставятся в очередь одновременно, поэтому старение здесь не действует
+    (оно нужно сервису, куда запросы поступают непрерывно, — см. CostScheduler).
+    При jobs > 1 или order="cost" результаты возвращаются в порядке завершения.
+
+    При order="cost" и jobs > 1 разбор перемежается с ожиданием ФИАС: заявления делятся на
+    CPU-емкие (разбор дороже проверки адресов) и ждущие сеть. Сначала потоки берут заявления
+    по ключу (мелкие вперед). Когда оставшаяся работа ждущих сеть заявлений (в расчете на
+    jobs - 1 потоков) сравнивается с оставшимся разбором CPU-емких, один поток переходит
+    на CPU-емкие: разбор крупных пакетов идет, пока последние мелкие ждут ответа ФИАС
+    (ожидание отпускает GIL), а не остается в хвосте, где перекрывать его нечем.
+
+    Возвращает (app_id, результат, исключение, сведения о планировании) по мере завершения;
+    при order="submission" стоимость не оценивается и estimated_ms равно 0.
+    """
+    by_cost = order == "cost"
+    cpu_pending: CostQueue[Tuple[str, List[str], PackageCost, float]] = CostQueue()
+    io_pending: CostQueue[Tuple[str, List[str], PackageCost, float]] = CostQueue()
+    # Оставшаяся оценка: полная стоимость ждущих сеть заявлений и разбор CPU-емких
+    remaining = {"io": 0.0, "cpu": 0.0}
+    for app_id, paths in applications:
+        # Порядок поступления оценку не использует: файлы заявления не читаются заранее
+        cost = estimate_cost(paths) if by_cost else PackageCost()
+        if by_cost and cost.cpu_bound:
+            cpu_pending.push((app_id, paths, cost, _now_ms()), cost.total_ms)
+            remaining["cpu"] += cost.cpu_ms
+        else:
+            io_pending.push((app_id, paths, cost, _now_ms()), cost.total_ms if by_cost else 0.0)
+            remaining["io"] += cost.total_ms
+
+    lock = threading.Lock()
+    # Потребитель прекратил чтение (Ctrl-C, закрытие генератора): потоки не берут новые заявления
+    stopped = threading.Event()
+    running_cpu = [0]
+    done: "queue.Queue[Tuple[str, Any, Optional[Exception], Dict[str, Any]]]" = queue.Queue()
+    total = len(cpu_pending) + len(io_pending)
+
+    def take() -> Optional[Tuple[str, List[str], PackageCost, float]]:
+        if stopped.is_set() or (not cpu_pending and not io_pending):
+            return None
+        if jobs > 1 and cpu_pending and io_pending and running_cpu[0]:
+            source = io_pending
+        elif jobs > 1 and cpu_pending and remaining["io"] / (jobs - 1) <= remaining["cpu"]:
+            source = cpu_pending
+        else:
+            source = cpu_pending if cpu_pending.peek_key() < io_pending.peek_key() else io_pending
+        item = source.pop()
+        if source is cpu_pending:
+            running_cpu[0] += 1
+            remaining["cpu"] -= item[2].cpu_ms
+        else:
+            remaining["io"] -= item[2].total_ms
+        return item
+
+    def worker() -> None:
+        while True:
+            with lock:
+                item = take()
+            if item is None:
+                return
+            app_id, paths, cost, queued_at = item
+            started = _now_ms()
+            result, error = None, None
+            try:
+                result = run(app_id, paths)
+            except Exception as e:
+                error = e
+            if by_cost and cost.cpu_bound:
+                with lock:
+                    running_cpu[0] -= 1
+            done.put((app_id, result, error, {
+                "estimated_ms": round(cost.total_ms, 1), "queue_ms": round(started - queued_at, 1),
+                "run_ms": round(_now_ms() - started, 1),
+            }))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+    try:
+        for _ in range(max(1, jobs)):
+            executor.submit(worker)
+        for _ in range(total):
+            yield done.get()
+    finally:
+        # Без ожидания: уже начатые заявления дорабатывают в фоне, новые не начинаются
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,234 @@
+import struct
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, Optional, Tuple
+
+# Компактные типизированные записи извлеченных данных (по одной на DocType).
+# Записи используют __slots__ и сериализуются в плотный бинарный формат, поэтому
+# тысячи заявлений можно держать в памяти и передавать между процессами.
+
+
+@dataclass(slots=True)
+class ExtractionRecord:
+    """Базовый класс записей Агента 2."""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def to_bytes(self) -> bytes:
+        return encode_record(self)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "ExtractionRecord":
+        return decode_record(data)
+
+    def __reduce__(self):
+        # pickle использует компактную бинарную форму вместо словаря атрибутов
+        return (decode_record, (encode_record(self),))
+
+
+@dataclass(slots=True)
+class ObjectRecord(ExtractionRecord):
+    """Обособленное подразделение (объект) из заявления."""
+    address: Optional[str] = None
+    cadastral_number: Optional[str] = None
+    name: Optional[str] = None
+    fias_id: Optional[str] = None
+    kpp: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ApplicationRecord(ExtractionRecord):
+    """Заявление о выдаче лицензии."""
+    inn: Optional[str] = None
+    kpp: Optional[str] = None
+    company_name: Optional[str] = None
+    objects: Tuple[ObjectRecord, ...] = ()
+    ogrn: Optional[str] = None
+
+
+@dataclass(slots=True)
+class SubdivisionRecord(ExtractionRecord):
+    """Место нахождения организации или обособленного подразделения по данным ЕГРЮЛ."""
+    kind: Optional[str] = None  # HEAD, BRANCH, REPRESENTATIVE, SUBDIVISION
+    name: Optional[str] = None
+    address: Optional[str] = None
+    fias_id: Optional[str] = None
+    kpp: Optional[str] = None
+
+
+@dataclass(slots=True)
+class EgrulRecord(ExtractionRecord):
+    """Выписка из ЕГРЮЛ."""
+    inn: Optional[str] = None
+    kpp: Optional[str] = None
+    company_name: Optional[str] = None
+    status: Optional[str] = None
+    ogrn: Optional[str] = None
+    subdivisions: Tuple[SubdivisionRecord, ...] = ()
+
+
+@dataclass(slots=True)
+class FnsDebtRecord(ExtractionRecord):
+    """Сведения ФНС о задолженности свыше 3000 рублей."""
+    has_debt_over_3000: bool = False
+
+
+@dataclass(slots=True)
+class RnipGroupRecord(ExtractionRecord):
+    """Агрегат платежей или начислений РНиП с одинаковыми КБК и ИНН плательщика."""
+    kbk: Optional[str] = None
+    payer_inn: Optional[str] = None
+    purpose: Optional[str] = None
+    count: int = 0
+    amount: float = 0.0
+
+
+@dataclass(slots=True)
+class RnipPaymentRecord(ExtractionRecord):
+    """Сведения РНиП об оплатах (госпошлина): итог по всем платежам ответа."""
+    amount: float = 0.0
+    currency: str = "RUB"
+    payments_count: int = 0
+    groups: Tuple[RnipGroupRecord, ...] = ()
+
+
+@dataclass(slots=True)
+class RnipChargeRecord(ExtractionRecord):
+    """Сведения РНиП о начислениях (штрафы): итог неоплаченных сумм по всем начислениям."""
+    outstanding_amount: float = 0.0
+    currency: str = "RUB"
+    charges_count: int = 0
+    groups: Tuple[RnipGroupRecord, ...] = ()
+
+
+@dataclass(slots=True)
+class RosreestrRecord(ExtractionRecord):
+    """Выписка из ЕГРН об объекте недвижимости."""
+    cadastral_number: Optional[str] = None
+    area: Optional[str] = None
+    purpose: Optional[str] = None
+
+
+# Идентификаторы типов в бинарном формате. Порядок менять нельзя: только дописывать в конец.
+RECORD_TYPES = (
+    ObjectRecord,
+    ApplicationRecord,
+    EgrulRecord,
+    FnsDebtRecord,
+    RnipPaymentRecord,
+    RosreestrRecord,
+    RnipGroupRecord,
+    RnipChargeRecord,
+    SubdivisionRecord,
+)
+_TYPE_IDS = {cls: i for i, cls in enumerate(RECORD_TYPES)}
+_FIELD_NAMES = {cls: tuple(f.name for f in fields(cls)) for cls in RECORD_TYPES}
+
+# Теги значений. Как и RECORD_TYPES, только дописываются в конец.
+# _INT — неотрицательное целое, _SINT — любое целое в zigzag-кодировке (0, -1, 1, -2 -> 0, 1, 2, 3)
+_NONE, _STR, _FLOAT, _FALSE, _TRUE, _TUPLE, _RECORD, _INT, _SINT, _LIST = range(10)
+_DOUBLE = struct.Struct("<d")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_value(out: bytearray, value: Any) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        out.append(_STR)
+        _write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, int) and value >= 0:
+        out.append(_INT)
+        _write_varint(out, value)
+    elif isinstance(value, int):
+        out.append(_SINT)
+        _write_varint(out, -2 * value - 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, (tuple, list)):
+        out.append(_TUPLE if isinstance(value, tuple) else _LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_value(out, item)
+    elif isinstance(value, ExtractionRecord):
+        cls = type(value)
+        out.append(_RECORD)
+        out.append(_TYPE_IDS[cls])
+        for name in _FIELD_NAMES[cls]:
+            _encode_value(out, getattr(value, name))
+    else:
+        raise TypeError(f"Unsupported value in record: {type(value).__name__}")
+
+
+def _decode_value(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _STR:
+        length, pos = _read_varint(data, pos)
+        return data[pos:pos + length].decode("utf-8"), pos + length
+    if tag == _INT:
+        return _read_varint(data, pos)
+    if tag == _SINT:
+        zigzag, pos = _read_varint(data, pos)
+        return (zigzag >> 1) ^ -(zigzag & 1), pos
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + _DOUBLE.size
+    if tag in (_TUPLE, _LIST):
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(data, pos)
+            items.append(item)
+        return (tuple(items) if tag == _TUPLE else items), pos
+    if tag == _RECORD:
+        cls = RECORD_TYPES[data[pos]]
+        pos += 1
+        values = []
+        for _ in _FIELD_NAMES[cls]:
+            value, pos = _decode_value(data, pos)
+            values.append(value)
+        return cls(*values), pos
+    raise ValueError(f"Unknown record tag: {tag}")
+
+
+def encode_record(record: ExtractionRecord) -> bytes:
+    """Сериализует запись (включая вложенные записи) в компактный бинарный формат."""
+    out = bytearray()
+    _encode_value(out, record)
+    return bytes(out)
+
+
+def decode_record(data: bytes) -> ExtractionRecord:
+    """Восстанавливает запись из бинарного формата encode_record."""
+    record, _ = _decode_value(data, 0)
+    return record
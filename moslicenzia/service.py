@@ -0,0 +1,408 @@
+"""
+Локальный HTTP-сервис экспертизы с пулом заранее запущенных воркеров.
+
+    python -m moslicenzia serve [--workers N] [--port 8780]
+
+Каждый воркер — отдельный процесс, который один раз импортирует зависимости, строит
+AnalyticalOrchestrator (скомпилированный граф) и открывает долгоживущую MCP-сессию
+с Агентом 6. Поэтому задержка запроса включает только работу над самим пакетом.
+
+    POST /expertise   multipart/form-data: файлы (XML или ZIP) и необязательное поле app_id.
+                      Ответ — поток JSON-строк (application/x-ndjson): событие на каждый
+                      узел графа и итоговый результат. С ?stream=0 — один JSON-ответ.
+    GET  /health      Состояние пула.
+
+Заголовки задержки: X-Upload-Ms (прием файлов), X-Queue-Ms (ожидание свободного воркера),
+X-Estimated-Cost-Ms (оценка стоимости пакета), в режиме ?stream=0 также X-Expertise-Ms,
+X-Total-Ms и Server-Timing. Когда все воркеры заняты, освободившийся воркер получает
+самый дешевый из ожидающих пакетов с учетом старения (moslicenzia.scheduling).
+"""
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from moslicenzia.scheduling import AGING_RATE, CostScheduler, estimate_cost
+
+DEFAULT_SERVICE_PORT = 8780
+
+# Сколько ждать свободного воркера, прежде чем ответить 503
+ACQUIRE_TIMEOUT = 300.0
+
+# Запуск воркера: импорт зависимостей, сборка графа и открытие MCP-сессии
+WORKER_START_TIMEOUT = 120.0
+
+# Пауза перед повторной попыткой заменить воркер, который не запустился
+WORKER_RESTART_DELAY = 5.0
+
+_UNSAFE_NAME_RE = re.compile(r"[^\w.\- ]+")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _worker_main(conn, options: Dict[str, Any]) -> None:
+    """
+    Цикл воркера: прогрев, затем задания из канала. На каждое задание в канал уходят
+    события ("node", ...) после каждого узла графа и завершающее ("result", ...) или ("error", ...).
+    """
+    started = time.perf_counter()
+    from moslicenzia.agents.agent2_parser.xsd import XsdValidationMode
+    from moslicenzia.agents.agent4_analytical.agent import AnalyticalOrchestrator
+    from moslicenzia.agents.agent6_mcp.client import PersistentSession
+    from moslicenzia.cli import serialize_expertise
+
+    mcp_session = None
+    mcp_error = None
+    if options.get("warm_mcp", True):
+        # Без URL сервер Агента 6 запускается тем же интерпретатором, что и воркер;
+        # окружение передается целиком (MOSLICENZIA_FIAS_URL и др.). Упавшую сессию
+        # оркестратор открывает заново перед следующей проверкой (PersistentSession.ensure_open)
+        try:
+            mcp_session = PersistentSession(options.get("mcp_url"), env=dict(os.environ)).start()
+        except Exception as e:
+            mcp_error = str(e)
+
+    orchestrator = AnalyticalOrchestrator(
+        xsd_mode=XsdValidationMode(options.get("xsd", "off")), registry_url=options.get("registry_url"),
+        mcp_url=options.get("mcp_url"), mcp_session=mcp_session,
+    )
+    store = None
+    if options.get("results_url"):
+        from moslicenzia.storage.results import ExpertiseResultStore
+        store = ExpertiseResultStore(options["results_url"])
+
+    conn.send(("ready", {"pid": os.getpid(), "warmup_ms": _elapsed_ms(started),
+                         "mcp_session": mcp_session is not None, "mcp_error": mcp_error}))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        try:
+            job_started = time.perf_counter()
+            node_started = job_started
+            state = None
+            for node, state in orchestrator.stream_expertise(job["documents"], app_id=job["app_id"]):
+                conn.send(("node", {"node": node, "node_ms": _elapsed_ms(node_started),
+                                    "elapsed_ms": _elapsed_ms(job_started),
+                                    "findings": len(state["analysis_findings"])}))
+                node_started = time.perf_counter()
+            if store is not None:
+                store.save(state)
+            conn.send(("result", {**serialize_expertise(state), "expertise_ms": _elapsed_ms(job_started)}))
+        except Exception as e:
+            conn.send(("error", {"comment": str(e)}))
+
+    if mcp_session is not None:
+        mcp_session.close()
+
+
+class Worker:
+    """Процесс-воркер и его конец канала."""
+
+    def __init__(self, context, options: Dict[str, Any]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, options), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.info: Dict[str, Any] = {}
+
+    def wait_ready(self, timeout: float = WORKER_START_TIMEOUT) -> None:
+        try:
+            ready = self.conn.poll(timeout)
+            if ready:
+                _, self.info = self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            raise TimeoutError(f"Воркер {self.process.pid} завершился при запуске (код {self.process.exitcode})")
+        if not ready:
+            raise TimeoutError(f"Воркер {self.process.pid} не запустился за {timeout:.0f} с")
+
+    def run(self, job: Dict[str, Any]) -> Iterator[tuple]:
+        """
+        Отправляет задание и возвращает события до завершающего включительно.
+        Завершение процесса воркера превращается в событие ("error", ...).
+        """
+        try:
+            self.conn.send(job)
+            while True:
+                event, payload = self.conn.recv()
+                yield event, payload
+                if event in ("result", "error"):
+                    return
+        except (EOFError, OSError) as e:
+            yield "error", {"comment": f"Воркер {self.process.pid} завершился: {e}"}
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Пул заранее запущенных воркеров. Свободные воркеры раздаются ожидающим запросам
+    в порядке оценки стоимости со старением; воркер, процесс которого завершился
+    во время задания, заменяется новым в фоновом потоке. Неудачный запуск замены
+    учитывается в restart_failures и повторяется, пока пул не закрыт.
+    """
+
+    def __init__(self, size: int = 2, aging: float = AGING_RATE, **options: Any):
+        self.size = size
+        self.options = options
+        # spawn одинаково работает в Windows и Linux и не копирует потоки HTTP-сервера
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: CostScheduler[Worker] = CostScheduler(aging)
+        self.workers: List[Worker] = []
+        self.stats = {"requests": 0, "errors": 0, "restarts": 0, "restart_failures": 0}
+        self.restart_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def start(self) -> "WorkerPool":
+        # Все воркеры стартуют одновременно, прогрев идет параллельно
+        self.workers = [Worker(self._context, self.options) for _ in range(self.size)]
+        for worker in self.workers:
+            worker.wait_ready()
+            self._idle.put(worker)
+        return self
+
+    def acquire(self, cost_ms: float = 0.0, timeout: float = ACQUIRE_TIMEOUT) -> Worker:
+        return self._idle.get(cost_ms, timeout=timeout)
+
+    def release(self, worker: Worker) -> None:
+        if worker.process.is_alive():
+            self._idle.put(worker)
+            return
+        # Замена запускается в фоне: обработчик запроса не ждет прогрева нового воркера
+        worker.conn.close()
+        threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+
+    def _replace(self, dead: Worker) -> None:
+        """Запускает замену завершившегося воркера; при неудаче повторяет через WORKER_RESTART_DELAY."""
+        while not self._closed.is_set():
+            replacement = Worker(self._context, self.options)
+            try:
+                replacement.wait_ready()
+            except TimeoutError as e:
+                replacement.stop()
+                with self._lock:
+                    self.stats["restart_failures"] += 1
+                    self.restart_error = str(e)
+                self._closed.wait(WORKER_RESTART_DELAY)
+                continue
+            with self._lock:
+                if not self._closed.is_set():
+                    self.workers[self.workers.index(dead)] = replacement
+                    self.stats["restarts"] += 1
+                    self.restart_error = None
+                    self._idle.put(replacement)
+                    return
+            # Пул закрыли, пока замена прогревалась
+            replacement.stop()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"workers": [w.info for w in self.workers], "idle": self._idle.free,
+                "waiting": self._idle.waiting, "restart_error": self.restart_error, **self.stats}
+
+    def close(self) -> None:
+        """Останавливает все воркеры пула, включая занятые заданием, и дожидается их завершения."""
+        with self._lock:
+            self._closed.set()
+            workers = list(self.workers)
+        for worker in workers:
+            worker.stop()
+
+
+def _save_uploads(handler: BaseHTTPRequestHandler, target_dir: str) -> Dict[str, Any]:
+    """Разбирает multipart-тело запроса: файлы сохраняются в target_dir, поля возвращаются словарем."""
+    from python_multipart import parse_form
+
+    fields: Dict[str, str] = {}
+    paths: List[str] = []
+
+    def on_field(field) -> None:
+        fields[field.field_name.decode()] = (field.value or b"").decode("utf-8")
+
+    def on_file(file) -> None:
+        name = os.path.basename((file.file_name or b"").decode("utf-8", "replace"))
+        name = _UNSAFE_NAME_RE.sub("_", name).strip() or f"document_{len(paths)}.xml"
+        path = os.path.join(target_dir, f"{len(paths):03d}_{name}")
+        file.file_object.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(file.file_object, f)
+        paths.append(path)
+
+    # parse_form ищет заголовки с учетом регистра (Content-Type, Content-Length)
+    headers = {name.title(): value.encode("latin-1") for name, value in handler.headers.items()}
+    parse_form(headers, handler.rfile, on_field, on_file)
+    return {"fields": fields, "paths": paths}
+
+
+class ExpertiseService:
+    """HTTP-сервис поверх пула воркеров (ThreadingHTTPServer, поток на соединение)."""
+
+    def __init__(self, pool: WorkerPool, host: str = "127.0.0.1", port: int = DEFAULT_SERVICE_PORT):
+        self.pool = pool
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        pool = self.pool
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Поток событий пишется мелкими порциями: без TCP_NODELAY каждая ждет ACK клиента
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                payload = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+                if status >= 400:
+                    # Тело запроса могло остаться непрочитанным
+                    self.close_connection = True
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _write_chunk(self, event: Dict[str, Any]) -> None:
+                line = json.dumps(event, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if urlsplit(self.path).path != "/health":
+                    self._send_json(404, {"error": "Not Found"})
+                    return
+                self._send_json(200, pool.snapshot())
+
+            def do_POST(self):
+                parts = urlsplit(self.path)
+                if parts.path != "/expertise":
+                    self._send_json(404, {"error": "Not Found"})
+                    return
+                query = parse_qs(parts.query)
+                stream = query.get("stream", ["1"])[0] not in ("0", "false")
+                started = time.perf_counter()
+                pool.count("requests")
+
+                with tempfile.TemporaryDirectory(prefix="moslicenzia-") as tmp_dir:
+                    try:
+                        upload = _save_uploads(self, tmp_dir)
+                    except Exception as e:
+                        pool.count("errors")
+                        self._send_json(400, {"error": f"Некорректное multipart-тело: {e}"})
+                        return
+                    if not upload["paths"]:
+                        pool.count("errors")
+                        self._send_json(400, {"error": "Не передано ни одного документа"})
+                        return
+                    upload_ms = _elapsed_ms(started)
+                    app_id = upload["fields"].get("app_id") or query.get("app_id", ["REQ-001"])[0]
+                    cost = estimate_cost(upload["paths"])
+
+                    queued = time.perf_counter()
+                    try:
+                        worker = pool.acquire(cost.total_ms)
+                    except queue.Empty:
+                        pool.count("errors")
+                        self._send_json(503, {"error": "Нет свободных воркеров"})
+                        return
+                    queue_ms = _elapsed_ms(queued)
+                    timing = {"X-Upload-Ms": str(upload_ms), "X-Queue-Ms": str(queue_ms),
+                              "X-Estimated-Cost-Ms": str(round(cost.total_ms, 1))}
+
+                    events = worker.run({"app_id": app_id, "documents": [{"path": p} for p in upload["paths"]]})
+                    try:
+                        if stream:
+                            self._stream(events, timing)
+                        else:
+                            self._respond_once(events, timing, started, upload_ms, queue_ms)
+                    except OSError:
+                        # Клиент разорвал соединение: оставшиеся события вычитываются ниже,
+                        # чтобы они не достались следующему заданию воркера
+                        pool.count("errors")
+                        self.close_connection = True
+                    finally:
+                        for _ in events:
+                            pass
+                        pool.release(worker)
+
+            def _stream(self, events, timing: Dict[str, str]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in timing.items():
+                    self.send_header(name, value)
+                self.send_header("Server-Timing", f"upload;dur={timing['X-Upload-Ms']}, queue;dur={timing['X-Queue-Ms']}")
+                self.end_headers()
+                for event, payload in events:
+                    if event == "error":
+                        pool.count("errors")
+                    self._write_chunk({"event": event, **payload})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _respond_once(self, events, timing: Dict[str, str], started: float,
+                              upload_ms: float, queue_ms: float) -> None:
+                nodes = []
+                event, payload = "error", {"comment": "Нет ответа воркера"}
+                for event, payload in events:
+                    if event == "node":
+                        nodes.append(payload)
+                expertise_ms = payload.get("expertise_ms", 0.0)
+                headers = {
+                    **timing,
+                    "X-Expertise-Ms": str(expertise_ms),
+                    "X-Total-Ms": str(_elapsed_ms(started)),
+                    "Server-Timing": ", ".join(
+                        [f"upload;dur={upload_ms}", f"queue;dur={queue_ms}"]
+                        + [f"{n['node']};dur={n['node_ms']}" for n in nodes]
+                    ),
+                }
+                if event == "error":
+                    pool.count("errors")
+                    self._send_json(500, payload, headers)
+                else:
+                    self._send_json(200, {**payload, "nodes": nodes}, headers)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self.httpd.serve_forever()
+
+    def close(self) -> None:
+        self.httpd.server_close()
+        self.pool.close()
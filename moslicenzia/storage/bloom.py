@@ -0,0 +1,46 @@
+import hashlib
+import math
+from typing import List, Optional
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для быстрой предварительной проверки «точно нет в реестре».
+    Ложноположительные срабатывания возможны (перепроверяются по БД), ложноотрицательные — нет.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[bytes] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> "BloomFilter":
+        capacity = max(capacity, 1)
+        num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def capacity(self, error_rate: float = 0.01) -> int:
+        """Число ключей, при котором доля ложноположительных срабатываний не превышает error_rate."""
+        return int(-self.num_bits * (math.log(2) ** 2) / math.log(error_rate))
+
+    def _positions(self, key: str) -> List[int]:
+        # Двойное хеширование: k позиций из одного 128-битного дайджеста
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> None:
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
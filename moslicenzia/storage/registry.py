@@ -0,0 +1,286 @@
+import csv
+import os
+import time
+import lxml.etree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import (
+    Column, Index, Integer, LargeBinary, MetaData, String, Table,
+    and_, bindparam, create_engine, func, or_, select,
+)
+from moslicenzia.address import address_key
+from moslicenzia.storage.bloom import BloomFilter
+
+# Реестр отозванных/аннулированных лицензий и исторических заявителей.
+# По умолчанию используется локальный файл SQLite; URL можно задать через MOSLICENZIA_REGISTRY_DB.
+DEFAULT_REGISTRY_URL = os.environ.get("MOSLICENZIA_REGISTRY_DB", "sqlite:///registry.db")
+
+# Поля записи реестра во входных выгрузках (CSV-заголовки или атрибуты/элементы XML)
+RECORD_FIELDS = (
+    "inn", "ogrn", "kpp", "address", "company_name",
+    "license_number", "status", "event_date", "reason",
+)
+
+BULK_BATCH_SIZE = 10000
+
+# Фильтр Блума перестраивается с запасом емкости: последующие загрузки добавляют ключи
+# в существующий фильтр, пока число ключей не превысит расчетную емкость
+BLOOM_ERROR_RATE = 0.01
+BLOOM_HEADROOM = 2.0
+
+# Как часто lookup проверяет, не сохранил ли другой процесс (registry-load, --reindex) новый фильтр
+BLOOM_REFRESH_SECONDS = 5.0
+
+metadata = MetaData()
+
+registry_records = Table(
+    "registry_records", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("inn", String(12)),
+    Column("ogrn", String(15)),
+    Column("kpp", String(9)),
+    Column("address", String),
+    Column("address_key", String),
+    Column("company_name", String),
+    Column("license_number", String),
+    Column("status", String),
+    Column("event_date", String(10)),
+    Column("reason", String),
+    Column("source", String),
+    Index("ix_registry_inn_kpp", "inn", "kpp"),
+    Index("ix_registry_ogrn", "ogrn"),
+    Index("ix_registry_address_key", "address_key"),
+)
+
+# Единственная строка; id — номер поколения фильтра, растет при каждом сохранении
+registry_bloom = Table(
+    "registry_bloom", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("num_bits", Integer, nullable=False),
+    Column("num_hashes", Integer, nullable=False),
+    Column("bits", LargeBinary, nullable=False),
+)
+
+
+def _bloom_keys(inn: Optional[str] = None, ogrn: Optional[str] = None, addr_key: Optional[str] = None) -> List[str]:
+    keys = []
+    if inn:
+        keys.append(f"inn:{inn}")
+    if ogrn:
+        keys.append(f"ogrn:{ogrn}")
+    if addr_key:
+        keys.append(f"addr:{addr_key}")
+    return keys
+
+
+def iter_csv_records(path: str) -> Iterator[Dict[str, Optional[str]]]:
+    """Потоковое чтение CSV-выгрузки (заголовок с именами полей RECORD_FIELDS, разделитель , или ;)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        dialect = csv.Sniffer().sniff(f.read(4096), delimiters=",;")
+        f.seek(0)
+        for row in csv.DictReader(f, dialect=dialect):
+            yield {field: (row.get(field) or "").strip() or None for field in RECORD_FIELDS}
+
+
+def iter_xml_records(path: str, tag: str = "Record") -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Потоковое чтение XML-выгрузки: элементы <Record> с полями в атрибутах или дочерних элементах.
+    Обработанные элементы освобождаются, поэтому память не зависит от размера файла.
+    """
+    for _, elem in ET.iterparse(path, events=("end",), tag=f"{{*}}{tag}"):
+        record = {}
+        for field in RECORD_FIELDS:
+            value = elem.get(field)
+            if value is None:
+                child = elem.find(f"{{*}}{field}")
+                value = child.text if child is not None else None
+            record[field] = value.strip() if value and value.strip() else None
+        yield record
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+class RevokedLicenseRegistry:
+    """
+    Локальное индексированное хранилище исторических данных о лицензиях.
+    Индексы по ИНН/КПП, ОГРН и ключу адреса; фильтр Блума отсекает «чистых» заявителей
+    без обращения к БД. Фильтр, сохраненный другим процессом, подхватывается
+    не позже чем через BLOOM_REFRESH_SECONDS.
+    """
+
+    def __init__(self, url: str = DEFAULT_REGISTRY_URL):
+        self.engine = create_engine(url)
+        metadata.create_all(self.engine)
+        with self.engine.connect() as conn:
+            self.bloom, self._bloom_generation = self._stored_bloom(conn)
+        self._bloom_checked = time.monotonic()
+
+    def _refresh_bloom(self) -> None:
+        now = time.monotonic()
+        if now - self._bloom_checked < BLOOM_REFRESH_SECONDS:
+            return
+        self._bloom_checked = now
+        with self.engine.connect() as conn:
+            generation = conn.execute(select(func.max(registry_bloom.c.id))).scalar() or 0
+            if generation != self._bloom_generation:
+                self.bloom, self._bloom_generation = self._stored_bloom(conn)
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(registry_records)).scalar_one()
+
+    def _stored_bloom(self, conn) -> Tuple[Optional[BloomFilter], int]:
+        """Сохраненный фильтр и его поколение (0 — фильтра нет)."""
+        row = conn.execute(select(registry_bloom).order_by(registry_bloom.c.id.desc()).limit(1)).first()
+        if row is None:
+            return None, 0
+        return BloomFilter(row.num_bits, row.num_hashes, row.bits), row.id
+
+    def _save_bloom(self, conn, bloom: BloomFilter) -> None:
+        generation = (conn.execute(select(func.max(registry_bloom.c.id))).scalar() or 0) + 1
+        conn.execute(registry_bloom.delete())
+        conn.execute(registry_bloom.insert(), {
+            "id": generation, "num_bits": bloom.num_bits, "num_hashes": bloom.num_hashes, "bits": bytes(bloom.bits),
+        })
+        self._bloom_generation = generation
+
+    def bulk_load(self, records: Iterable[Dict[str, Optional[str]]], source: Optional[str] = None) -> int:
+        """
+        Пакетная вставка записей (поток словарей). Ключи новых записей добавляются
+        в сохраненный фильтр Блума; полное перестроение — только когда его емкость исчерпана.
+        """
+        loaded = 0
+        batch: List[Dict[str, Optional[str]]] = []
+        with self.engine.begin() as conn:
+            bloom, _ = self._stored_bloom(conn)
+            # По три ключа на запись (ИНН, ОГРН, адрес) — оценка сверху
+            existing_keys = conn.execute(select(func.count()).select_from(registry_records)).scalar_one() * 3
+
+            def flush() -> None:
+                nonlocal bloom, loaded
+                conn.execute(registry_records.insert(), batch)
+                loaded += len(batch)
+                if bloom is not None and existing_keys + loaded * 3 > bloom.capacity(BLOOM_ERROR_RATE):
+                    bloom = None
+                if bloom is not None:
+                    for row in batch:
+                        for key in _bloom_keys(row["inn"], row["ogrn"], row["address_key"]):
+                            bloom.add(key)
+
+            for record in records:
+                row = {field: record.get(field) for field in RECORD_FIELDS}
+                row["address_key"] = address_key(row["address"])
+                row["source"] = source
+                batch.append(row)
+                if len(batch) >= BULK_BATCH_SIZE:
+                    flush()
+                    batch = []
+            if batch:
+                flush()
+            if bloom is not None:
+                self._save_bloom(conn, bloom)
+        if bloom is None:
+            self.rebuild_bloom()
+        else:
+            self.bloom = bloom
+        return loaded
+
+    def load_file(self, path: str) -> int:
+        """Загружает выгрузку реестра в формате CSV или XML (по расширению файла)."""
+        source = os.path.basename(path)
+        if path.lower().endswith(".xml"):
+            return self.bulk_load(iter_xml_records(path), source=source)
+        return self.bulk_load(iter_csv_records(path), source=source)
+
+    def reindex_addresses(self) -> int:
+        """
+        Пересчитывает ключи адресов всех записей (после изменения правил нормализации).
+        Записи читаются пакетами по BULK_BATCH_SIZE (по возрастанию id), поэтому память
+        не зависит от размера реестра. Новые ключи добавляются в фильтр Блума; прежние
+        остаются в нем и дают лишь ложноположительные срабатывания, которые отсекает БД.
+        Возвращает число измененных записей.
+        """
+        query = (select(registry_records.c.id, registry_records.c.address, registry_records.c.address_key)
+                 .order_by(registry_records.c.id).limit(BULK_BATCH_SIZE))
+        update = (registry_records.update()
+                  .where(registry_records.c.id == bindparam("row_id"))
+                  .values(address_key=bindparam("new_key")))
+        updated = 0
+        last_id = 0
+        with self.engine.begin() as conn:
+            bloom, _ = self._stored_bloom(conn)
+            existing_keys = conn.execute(select(func.count()).select_from(registry_records)).scalar_one() * 3
+            while True:
+                # Следующий пакет читается целиком до обновления: курсор не остается открытым над изменяемой таблицей
+                rows = conn.execute(query.where(registry_records.c.id > last_id)).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                changes = []
+                for row in rows:
+                    key = address_key(row.address)
+                    if key != row.address_key:
+                        changes.append({"row_id": row.id, "new_key": key})
+                if not changes:
+                    continue
+                conn.execute(update, changes)
+                updated += len(changes)
+                if bloom is not None and existing_keys + updated > bloom.capacity(BLOOM_ERROR_RATE):
+                    bloom = None
+                if bloom is not None:
+                    for change in changes:
+                        for key in _bloom_keys(addr_key=change["new_key"]):
+                            bloom.add(key)
+            if bloom is not None and updated:
+                self._save_bloom(conn, bloom)
+        if bloom is None:
+            self.rebuild_bloom()
+        else:
+            self.bloom = bloom
+        return updated
+
+    def rebuild_bloom(self, error_rate: float = BLOOM_ERROR_RATE) -> None:
+        """
+        Перестраивает фильтр Блума по всем ключам реестра (потоковым проходом по таблице)
+        с запасом емкости BLOOM_HEADROOM для последующих загрузок.
+        """
+        bloom = BloomFilter.for_capacity(int(self.count() * 3 * BLOOM_HEADROOM), error_rate)
+        query = select(registry_records.c.inn, registry_records.c.ogrn, registry_records.c.address_key)
+        with self.engine.begin() as conn:
+            for row in conn.execution_options(yield_per=BULK_BATCH_SIZE).execute(query):
+                for key in _bloom_keys(row.inn, row.ogrn, row.address_key):
+                    bloom.add(key)
+            self._save_bloom(conn, bloom)
+        self.bloom = bloom
+
+    def lookup(self, inn: Optional[str] = None, ogrn: Optional[str] = None, address: Optional[str] = None,
+               kpp: Optional[str] = None) -> List[Dict]:
+        """
+        Ищет записи реестра по ИНН, ОГРН или адресу. С kpp поиск по ИНН сужается до записей
+        этого КПП (обособленного подразделения) по составному индексу ix_registry_inn_kpp.
+        Если ни один ключ не прошел фильтр Блума, запрос к БД не выполняется;
+        без сохраненного фильтра выполняется индексный запрос.
+        """
+        self._refresh_bloom()
+        bloom = self.bloom
+        addr_key = address_key(address)
+
+        def may_contain(key: str) -> bool:
+            return bloom is None or key in bloom
+
+        conditions = []
+        if inn and may_contain(f"inn:{inn}"):
+            if kpp:
+                conditions.append(and_(registry_records.c.inn == inn, registry_records.c.kpp == kpp))
+            else:
+                conditions.append(registry_records.c.inn == inn)
+        if ogrn and may_contain(f"ogrn:{ogrn}"):
+            conditions.append(registry_records.c.ogrn == ogrn)
+        if addr_key and may_contain(f"addr:{addr_key}"):
+            conditions.append(registry_records.c.address_key == addr_key)
+        if not conditions:
+            return []
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(registry_records).where(or_(*conditions))).mappings().all()
+        return [dict(row) for row in rows]
@@ -0,0 +1,170 @@
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+    create_engine, func, select,
+)
+
+# Хранилище результатов экспертизы: итоговое состояние, замечания и отчет по каждому заявлению.
+# По умолчанию используется локальный файл SQLite; URL можно задать через MOSLICENZIA_RESULTS_DB.
+DEFAULT_RESULTS_URL = os.environ.get("MOSLICENZIA_RESULTS_DB", "sqlite:///results.db")
+
+BULK_BATCH_SIZE = 1000
+
+# Документы, из которых берутся реквизиты заявителя (в порядке приоритета)
+APPLICANT_DOC_TYPES = ("APPLICATION", "EGRUL")
+
+metadata = MetaData()
+
+expertise_results = Table(
+    "expertise_results", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("application_id", String, nullable=False),
+    Column("inn", String(12)),
+    Column("ogrn", String(15)),
+    Column("company_name", String),
+    Column("status", String(16), nullable=False),
+    Column("recommendation", String),
+    Column("created_at", DateTime, nullable=False),
+    Column("findings", Text),        # JSON-список замечаний
+    Column("documents", Text),       # JSON-список путей документов
+    Column("extracted_data", Text),  # JSON: тип документа -> список записей Агента 2
+    Column("report", Text),
+    Index("ix_results_application_id", "application_id"),
+    Index("ix_results_inn_created", "inn", "created_at"),
+    Index("ix_results_status_created", "status", "created_at"),
+    Index("ix_results_created", "created_at"),
+)
+
+# Колонки, возвращаемые запросами по умолчанию (без объемных отчета и извлеченных данных)
+SUMMARY_COLUMNS = (
+    "id", "application_id", "inn", "ogrn", "company_name",
+    "status", "recommendation", "created_at", "findings",
+)
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def _as_datetime(value: Union[date, datetime]) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
+
+
+def _applicant(extracted: Dict[Any, list]) -> Dict[str, Optional[str]]:
+    """Реквизиты заявителя из заявления, при их отсутствии — из выписки ЕГРЮЛ."""
+    applicant = {"inn": None, "ogrn": None, "company_name": None}
+    by_type = {_enum_value(doc_type): records for doc_type, records in extracted.items()}
+    for doc_type in APPLICANT_DOC_TYPES:
+        for record in by_type.get(doc_type) or []:
+            for field in applicant:
+                if applicant[field] is None:
+                    applicant[field] = getattr(record, field, None)
+    return applicant
+
+
+def result_row(result: Dict[str, Any], created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Строка таблицы из итогового состояния графа экспертизы (ExpertiseState)."""
+    extracted = result.get("extracted_data") or {}
+    return {
+        "application_id": result["application_id"],
+        **_applicant(extracted),
+        "status": _enum_value(result["overall_status"]),
+        "recommendation": result.get("recommendation"),
+        "created_at": created_at or datetime.now(),
+        "findings": json.dumps(result.get("analysis_findings") or [], ensure_ascii=False),
+        "documents": json.dumps([d.get("path") for d in result.get("documents") or []], ensure_ascii=False),
+        "extracted_data": json.dumps(
+            {_enum_value(doc_type): [r.to_dict() for r in records] for doc_type, records in extracted.items()},
+            ensure_ascii=False, default=str,
+        ),
+        "report": result.get("decision_draft"),
+    }
+
+
+def _decode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    decoded = dict(row)
+    for column in ("findings", "documents", "extracted_data"):
+        if decoded.get(column) is not None:
+            decoded[column] = json.loads(decoded[column])
+    return decoded
+
+
+class ExpertiseResultStore:
+    """
+    Индексированное хранилище результатов экспертизы.
+    Индексы по номеру заявления, ИНН, статусу и дате позволяют отвечать на запросы
+    вида «все отказы по ИНН за месяц» без повторного запуска экспертизы.
+    """
+
+    def __init__(self, url: str = DEFAULT_RESULTS_URL):
+        self.engine = create_engine(url)
+        metadata.create_all(self.engine)
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(expertise_results)).scalar_one()
+
+    def save(self, result: Dict[str, Any], created_at: Optional[datetime] = None) -> None:
+        """Сохраняет результат одного заявления."""
+        self.save_rows([result_row(result, created_at)])
+
+    def save_many(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Пакетное сохранение результатов (поток итоговых состояний)."""
+        return self.save_rows(result_row(result) for result in results)
+
+    def save_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Пакетная вставка готовых строк (см. result_row) одной транзакцией."""
+        saved = 0
+        batch = []
+        with self.engine.begin() as conn:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BULK_BATCH_SIZE:
+                    conn.execute(expertise_results.insert(), batch)
+                    saved += len(batch)
+                    batch = []
+            if batch:
+                conn.execute(expertise_results.insert(), batch)
+                saved += len(batch)
+        return saved
+
+    def query(self, application_id: Optional[str] = None, inn: Optional[str] = None,
+              status: Union[str, Sequence[str], None] = None,
+              since: Union[date, datetime, None] = None, until: Union[date, datetime, None] = None,
+              limit: Optional[int] = None, full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Ищет результаты по номеру заявления, ИНН, статусу (одному или нескольким) и периоду
+        [since, until). Дата без времени означает начало суток. Новые результаты — первыми.
+        full=True дополнительно возвращает отчет, документы и извлеченные данные.
+        """
+        t = expertise_results.c
+        columns = list(expertise_results.c) if full else [t[name] for name in SUMMARY_COLUMNS]
+        query = select(*columns)
+        if application_id:
+            query = query.where(t.application_id == application_id)
+        if inn:
+            query = query.where(t.inn == inn)
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            query = query.where(t.status.in_([_enum_value(s) for s in statuses]))
+        if since:
+            query = query.where(t.created_at >= _as_datetime(since))
+        if until:
+            query = query.where(t.created_at < _as_datetime(until))
+        query = query.order_by(t.created_at.desc(), t.id.desc())
+        if limit:
+            query = query.limit(limit)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).mappings().all()
+        return [_decode_row(row) for row in rows]
+
+    def latest(self, application_id: str) -> Optional[Dict[str, Any]]:
+        """Последний полный результат по заявлению (или None)."""
+        rows = self.query(application_id=application_id, limit=1, full=True)
+        return rows[0] if rows else None
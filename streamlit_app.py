@@ -56,6 +56,19 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_orchestrator() -> AnalyticalOrchestrator:
+    # Граф компилируется один раз на процесс Streamlit, а не при каждом запуске экспертизы
+    return AnalyticalOrchestrator()
+
+
+@st.cache_resource
+def get_result_store(url: str):
+    # Одно подключение (пул соединений) на URL хранилища для всех сессий
+    from moslicenzia.storage.results import ExpertiseResultStore
+    return ExpertiseResultStore(url)
+
+
 def main():
     st.title("🛡️ Moslicenzia: Предварительная Экспертиза")
     st.subheader("Автоматизированное рабочее место эксперта (Subsystem AI)")
@@ -78,8 +91,8 @@ def main():
     # Основной интерфейс
     st.markdown("### 📥 Загрузка документов")
     uploaded_files = st.file_uploader(
-        "Выберите XML файлы (Заявление, ЕГРЮЛ, ФНС, РНиП, Росреестр)", 
-        type=["xml"], 
+        "Выберите XML файлы или ZIP-архивы (Заявление, ЕГРЮЛ, ФНС, РНиП, Росреестр)", 
+        type=["xml", "zip"], 
         accept_multiple_files=True,
         help="Вы можете загрузить сразу несколько файлов, относящихся к одной заявке."
     )
@@ -99,10 +112,13 @@ def main():
                         doc_list.append({"path": tmp_path})
                     
                     st.write("Запуск оркестратора Agent 4...")
-                    orchestrator = AnalyticalOrchestrator()
+                    orchestrator = get_orchestrator()
                     
                     try:
                         result = orchestrator.run_expertise(doc_list, app_id=f"APP-{datetime.now().strftime('%H%M%S')}")
+                        # Сохранение в хранилище результатов, если оно настроено
+                        if os.environ.get("MOSLICENZIA_RESULTS_DB"):
+                            get_result_store(os.environ["MOSLICENZIA_RESULTS_DB"]).save(result)
                         
                         status.update(label="Экспертиза завершена!", state="complete", expanded=False)
                         
@@ -160,11 +176,11 @@ def main():
             if os.path.exists(docs_dir):
                 example_files = os.listdir(docs_dir)
                 st.write(f"Найдено примеров: {len(example_files)}")
-                doc_list = [{"path": os.path.join(docs_dir, f)} for f in example_files if f.endswith(".xml")]
+                doc_list = [{"path": os.path.join(docs_dir, f)} for f in example_files if f.lower().endswith((".xml", ".zip"))]
                 
                 if st.button("🚀 Запустить экспертизу на примерах"):
                     with st.status("Выполнение анализа на примерах...", expanded=True) as status:
-                        orchestrator = AnalyticalOrchestrator()
+                        orchestrator = get_orchestrator()
                         try:
                             result = orchestrator.run_expertise(doc_list, app_id="EXAMPLE-APP-001")
                             status.update(label="Экспертиза на примерах завершена!", state="complete", expanded=False)
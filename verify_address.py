@@ -0,0 +1,34 @@
+from moslicenzia.address import address_key
+
+# Группы записей одного адреса: внутри группы ключ должен совпадать, между группами — различаться
+EQUIVALENT_ADDRESSES = [
+    ["ул. Автозаводская, 18", "г Москва, ул Автозаводская, д 18", "Город Москва, Улица Автозаводская Дом 18"],
+    ["ул. 1-я Тверская-Ямская, 18", "г Москва, ул 1-я Тверская-Ямская, д 18", "Тверская-Ямская 1-я ул., дом 18"],
+    ["ул. 2-я Тверская-Ямская, 18", "г Москва, ул 2-я Тверская-Ямская, д 18"],
+    ["Ленинский пр-т, 32", "Ленинский проспект, д. 32", "г. Москва, Ленинский пркт, дом 32"],
+    ["2-й Донской проезд, 5, стр 1", "г Москва, 2-й Донской прд, д 5, строение 1"],
+    ["125009, Москва, ул. Тверская, 7к2", "г Москва, ул Тверская, д 7, корп 2"],
+]
+
+
+def verify_address():
+    print("--- Verifying address normalization ---")
+    failures = 0
+    keys = []
+    for group in EQUIVALENT_ADDRESSES:
+        group_keys = {address_key(address) for address in group}
+        if len(group_keys) == 1:
+            print(f"УСПЕХ: {group[0]!r} -> {group_keys.pop()!r}")
+        else:
+            failures += 1
+            print(f"ОШИБКА: Разные ключи для одного адреса: {[(a, address_key(a)) for a in group]}")
+        keys.append(address_key(group[0]))
+    if len(set(keys)) != len(keys):
+        failures += 1
+        print(f"ОШИБКА: Разные адреса дают одинаковый ключ: {keys}")
+    print(f"Проверено групп: {len(EQUIVALENT_ADDRESSES)}, ошибок: {failures}")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if verify_address() else 0)
@@ -1,12 +1,15 @@
 import asyncio
+import os
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from moslicenzia.agents.agent6_mcp.client import SERVER_COMMAND, SERVER_SCRIPT
 
 async def verify_agent6():
-    # Параметры для сервера Агента 6
+    # Параметры для сервера Агента 6: тот же интерпретатор, окружение целиком (MOSLICENZIA_FIAS_URL и др.)
     server_params = StdioServerParameters(
-        command="py",
-        args=["moslicenzia/agents/agent6_mcp/server.py"]
+        command=SERVER_COMMAND,
+        args=[SERVER_SCRIPT],
+        env=dict(os.environ),
     )
 
     print("--- Verifying Agent 6 (MCP FIAS) ---")
@@ -29,5 +32,10 @@ async def verify_agent6():
             res_kpp = await session.call_tool("get_subdivision_kpp", {"fias_id": "fias-123"})
             print(f"Result: {res_kpp.content[0].text if res_kpp.content else 'None'}")
 
+            # 4. Состояние эндпоинтов ФИАС
+            print("\nTesting: get_fias_health")
+            res_health = await session.call_tool("get_fias_health", {})
+            print(f"Result: {res_health.content[0].text if res_health.content else 'None'}")
+
 if __name__ == "__main__":
     asyncio.run(verify_agent6())
@@ -41,8 +41,8 @@ def test_pipeline():
             # 2. Парсинг
             res2 = parser.parse(doc_type, path)
             print(f"Agent 2 (Parser): {res2.status}")
-            if res2.data:
-                print(f"Extracted Data: {res2.data}")
+            if res2.data.get("record") is not None:
+                print(f"Extracted Data: {res2.data['record']}")
             else:
                 print(f"Error: {res2.comment}")
         else: